@@ -1,43 +1,207 @@
+import threading
+from time import perf_counter
+from collections.abc import AsyncIterator
+import numpy as np
 from llama_index.core import PromptTemplate
-from llama_index.core.agent import ReActAgent
-from music_assistant.tools import (
-    music_query_tool,
-    wikipedia_tool,
-    lyrics_genius_tool,
-    create_Spotify_playlist_tool,
-    show_all_Spotify_playlists_tool,
-    show_specific_Spotify_playlist_tracks_tool,
-    get_artist_Spotify_tool,
-    get_several_artists_Spotify_tool,
-    get_user_information_tool,
-    read_saved_user_Spotify_information_tool,
-    get_recommendations_Spotify_tool,
-    search_Spotify_tool,
-    get_album_Spotify_tool
-)
+from llama_index.core.agent import ReActAgent, AgentRunner, FunctionCallingAgentWorker
+from llama_index.core.agent.types import Task, TaskStep, TaskStepOutput
+from llama_index.core.async_utils import asyncio_run
+from llama_index.core.chat_engine.types import StreamingAgentChatResponse
+from llama_index.core.memory import ChatMemoryBuffer
+from music_assistant.config import get_agent_settings
+from music_assistant.prompts import function_calling_prompt_str
+from music_assistant.rags import get_llm, get_embed_model
+from music_assistant.registry import ToolRegistry
+from music_assistant.tool_retrieval import ToolRetriever
+from music_assistant.cache import locked_cache
+from music_assistant.tools import tool_registry
+
+SETTINGS = get_agent_settings()
+
+AGENT_MODES = ("react", "function_calling")
+
+
+class ParallelFunctionCallingAgentWorker(FunctionCallingAgentWorker):
+    """
+    The async step of FunctionCallingAgentWorker already runs the tool calls of one LLM response
+    concurrently (sync tools go to the event loop thread pool), the sync step runs them one by one.
+    Here the sync step also runs the async one.
+    """
+
+    def run_step(self, step: TaskStep, task: Task, **kwargs) -> TaskStepOutput:
+        return asyncio_run(self.arun_step(step, task, **kwargs))
+
+
+@locked_cache
+def get_tool_retriever(registry: ToolRegistry) -> ToolRetriever:
+    # Compartido por todos los agentes del registro, las descripciones se embeben una sola vez
+    return ToolRetriever(
+        registry.get_tools(),
+        get_embed_model,
+        top_k=SETTINGS.tool_retrieval_top_k,
+        always_include=SETTINGS.tool_retrieval_always_include,
+    )
+
 
 class MusicAgent:
-    def __init__(self, system_prompt: PromptTemplate | None = None):
-        self.agent = ReActAgent.from_tools(
-            [
-                music_query_tool,
-                wikipedia_tool,
-                lyrics_genius_tool,
-                create_Spotify_playlist_tool,
-                show_all_Spotify_playlists_tool,
-                show_specific_Spotify_playlist_tracks_tool,
-                get_artist_Spotify_tool,
-                get_several_artists_Spotify_tool,
-                get_user_information_tool,
-                read_saved_user_Spotify_information_tool,
-                get_recommendations_Spotify_tool,
-                search_Spotify_tool,
-                get_album_Spotify_tool
-            ],
-            verbose=True,
-        )
-        if system_prompt is not None:
-            self.agent.update_prompts({"agent_worker:system_prompt": system_prompt})
-
-    def get_agent(self) -> ReActAgent:
+    """
+    `mode="react"` is the ReAct agent, one tool per LLM round trip, and `system_prompt` replaces its prompt.
+    `mode="function_calling"` uses the native tool calling of the LLM: the model can ask for several
+    independent tools in one response and they run concurrently.
+    With `tool_retrieval` each step only gets the tools relevant to the user message, see ToolRetriever.
+    """
+
+    def __init__(
+        self,
+        system_prompt: PromptTemplate | None = None,
+        registry: ToolRegistry | None = None,
+        memory_token_limit: int | None = None,
+        mode: str = SETTINGS.agent_mode,
+        tool_retrieval: bool = SETTINGS.tool_retrieval,
+    ):
+        if registry is None:
+            registry = tool_registry
+        if mode not in AGENT_MODES:
+            raise ValueError(f"Unknown agent mode {mode!r}, expected one of {AGENT_MODES}")
+
+        self.registry = registry
+        self.mode = mode
+        with registry.phase("agent"):
+            # Sin limite la memoria usa casi toda la ventana de contexto del LLM
+            memory = ChatMemoryBuffer.from_defaults(token_limit=memory_token_limit) if memory_token_limit else None
+            # llama-index recibe las herramientas o un retriever, no ambos
+            tools, tool_retriever = registry.get_tools(), None
+            if tool_retrieval:
+                tools, tool_retriever = None, get_tool_retriever(registry)
+            if mode == "function_calling":
+                worker = ParallelFunctionCallingAgentWorker.from_tools(
+                    tools,
+                    tool_retriever=tool_retriever,
+                    llm=get_llm(),
+                    system_prompt=function_calling_prompt_str,
+                    max_function_calls=SETTINGS.agent_max_function_calls,
+                    allow_parallel_tool_calls=True,
+                    verbose=True,
+                )
+                self.agent = AgentRunner(worker, memory=memory, llm=get_llm())
+            else:
+                self.agent = ReActAgent.from_tools(
+                    tools,
+                    tool_retriever=tool_retriever,
+                    llm=get_llm(),
+                    memory=memory,
+                    verbose=True,
+                )
+                if system_prompt is not None:
+                    self.agent.update_prompts({"agent_worker:system_prompt": system_prompt})
+
+    def get_agent(self) -> AgentRunner:
         return self.agent
+
+
+class ChatMetrics:
+    """
+    Latency of the streamed answers: time to first token (TTFT) and total time, plus how many chats
+    were in flight at the same time.
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self._ttft: list[float] = []
+        self._total: list[float] = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finish(self, ttft: float | None, total: float):
+        with self._lock:
+            self.in_flight -= 1
+            if ttft is not None:
+                self._ttft = (self._ttft + [ttft])[-self.max_samples:]
+            self._total = (self._total + [total])[-self.max_samples:]
+
+    def stats(self) -> dict:
+        with self._lock:
+            ttft, total = list(self._ttft), list(self._total)
+        return {
+            "requests": len(total),
+            "ttft_p50": float(np.percentile(ttft, 50)) if ttft else None,
+            "ttft_p95": float(np.percentile(ttft, 95)) if ttft else None,
+            "total_p50": float(np.percentile(total, 50)) if total else None,
+            "total_p95": float(np.percentile(total, 95)) if total else None,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+
+chat_metrics = ChatMetrics()
+
+ANSWER_MARKER = "Answer:"
+
+
+def strip_answer_marker(text: str) -> str | None:
+    """
+    The streamed answer without the ReAct "Answer:" marker. The parser can split the marker between
+    chunks and only the end of it reaches the stream (": Hola", "er: Hola"), a leading suffix of the
+    marker is also removed. Returns None while `text` could still be the start of such a fragment.
+    """
+    if ANSWER_MARKER in text:
+        # El stream puede incluir el final del "Thought" que venia en el mismo chunk que "Answer:"
+        return text.split(ANSWER_MARKER, 1)[-1].lstrip()
+    stripped = text.lstrip()
+    for start in range(1, len(ANSWER_MARKER)):
+        fragment = ANSWER_MARKER[start:]
+        if stripped.startswith(fragment):
+            return stripped[len(fragment):].lstrip()
+        if fragment.startswith(stripped):
+            return None
+    return stripped
+
+
+async def astream_agent_response(
+    agent: AgentRunner, message: str, show_tool_calls: bool = False, metrics: ChatMetrics = chat_metrics
+) -> AsyncIterator[str]:
+    """
+    Runs the agent step by step with its async streaming API and yields the answer accumulated so far,
+    starting as soon as the LLM writes the final "Answer:". With `show_tool_calls` every tool call
+    is shown before the answer. The function calling agent can't stream, its answer comes in one piece.
+    """
+    start = perf_counter()
+    ttft = None
+    metrics.start()
+    try:
+        task = agent.create_task(message)
+        run_step = agent.arun_step if isinstance(agent.agent_worker, FunctionCallingAgentWorker) else agent.astream_step
+        steps_text = ""
+        seen_sources = 0
+        while True:
+            step_output = await run_step(task.task_id)
+            # Cada llamada a una herramienta deja su ToolOutput en las fuentes de la tarea
+            sources = task.extra_state["sources"]
+            if show_tool_calls and len(sources) > seen_sources:
+                steps_text += "".join(f"_Calling tool `{source.tool_name}`..._\n\n" for source in sources[seen_sources:])
+                yield steps_text
+            seen_sources = len(sources)
+            if step_output.is_last:
+                break
+
+        response = agent.finalize_response(task.task_id, step_output)
+        if isinstance(response, StreamingAgentChatResponse):
+            answer = ""
+            async for token in response.async_response_gen():
+                if ttft is None:
+                    ttft = perf_counter() - start
+                answer += token
+                text = strip_answer_marker(answer)
+                if text is not None:
+                    yield steps_text + text
+        else:
+            ttft = perf_counter() - start
+            yield steps_text + response.response
+    finally:
+        metrics.finish(ttft, perf_counter() - start)
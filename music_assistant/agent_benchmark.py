@@ -0,0 +1,71 @@
+import sys
+import asyncio
+import threading
+from time import perf_counter
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events import BaseEvent
+from llama_index.core.instrumentation.events.llm import LLMChatStartEvent
+from music_assistant.agent import MusicAgent, AGENT_MODES, get_tool_retriever
+from music_assistant.config import get_agent_settings
+from music_assistant.prompts import agent_prompt_tpl
+from music_assistant.tools import tool_registry
+
+SETTINGS = get_agent_settings()
+
+# Solo mensajes de lectura: el benchmark no debe crear ni modificar nada en la cuenta de Spotify
+BENCHMARK_MESSAGES = [
+    "¿Qué géneros escucho más según mi información de Spotify?",
+    "Dame información de Charli XCX y de su álbum Brat.",
+    "Recomiéndame canciones parecidas a lo que escucho y dime qué playlists tengo.",
+]
+
+_counter_lock = threading.Lock()
+
+
+class LLMCallCounter(BaseEventHandler):
+    count: int = 0
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMCallCounter"
+
+    def handle(self, event: BaseEvent, **kwargs) -> None:
+        if isinstance(event, LLMChatStartEvent):
+            with _counter_lock:
+                self.count += 1
+
+
+async def run_turn(agent, message: str, counter: LLMCallCounter) -> tuple[int, float]:
+    start_calls = counter.count
+    start = perf_counter()
+    await agent.achat(message)
+    return counter.count - start_calls, perf_counter() - start
+
+
+async def main(messages: list[str]):
+    counter = LLMCallCounter()
+    get_dispatcher().add_event_handler(counter)
+
+    results = {}
+    for mode in AGENT_MODES:
+        # Un agente nuevo por mensaje, cada turno se mide sin el historial de los anteriores
+        results[mode] = [
+            await run_turn(MusicAgent(agent_prompt_tpl, mode=mode).get_agent(), message, counter)
+            for message in messages
+        ]
+
+    print(f"{'mode':<18} {'turn':>4} {'LLM calls':>9} {'seconds':>8}")
+    for mode, turns in results.items():
+        for turn, (llm_calls, seconds) in enumerate(turns, start=1):
+            print(f"{mode:<18} {turn:>4} {llm_calls:>9} {seconds:>8.2f}")
+        total_calls = sum(llm_calls for llm_calls, _ in turns)
+        total_seconds = sum(seconds for _, seconds in turns)
+        print(f"{mode:<18} {'avg':>4} {total_calls / len(turns):>9.1f} {total_seconds / len(turns):>8.2f}")
+    if SETTINGS.tool_retrieval:
+        print(get_tool_retriever(tool_registry).report())
+
+
+if __name__ == "__main__":
+    # uv run python -m music_assistant.agent_benchmark ["mensaje 1" "mensaje 2" ...]
+    asyncio.run(main(sys.argv[1:] or BENCHMARK_MESSAGES))
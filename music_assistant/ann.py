@@ -0,0 +1,176 @@
+import math
+import threading
+from typing import Any, Sequence
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import VectorStoreQuery, VectorStoreQueryResult, VectorStoreQueryMode
+from music_assistant.config import get_agent_settings
+
+SETTINGS = get_agent_settings()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def train_ivf(matrix: np.ndarray, nlist: int | None = None, iterations: int = 10) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Spherical k-means over the (normalized) rows of `matrix`, trained on a sample of at most 64 rows per list.
+    Returns the centroids and the list each row is assigned to. `nlist` defaults to sqrt(rows).
+    """
+    num_vectors = len(matrix)
+    nlist = min(nlist or max(1, int(math.sqrt(num_vectors))), num_vectors)
+    rng = np.random.default_rng(0)
+    sample = np.asarray(matrix[np.sort(rng.choice(num_vectors, min(num_vectors, nlist * 64), replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for index in range(nlist):
+            members = sample[assignments == index]
+            if len(members):
+                centroids[index] = members.mean(axis=0)
+        centroids = normalize_rows(centroids)
+
+    assignments = np.argmax(matrix @ centroids.T, axis=1)
+    return centroids, assignments
+
+
+class IVFVectorStore(SimpleVectorStore):
+    """
+    SimpleVectorStore with an inverted-file (IVF) index on top: vectors are clustered with spherical k-means
+    into `nlist` lists and a query only scores the vectors of its `nprobe` closest lists.
+    Higher `nprobe` gives better recall and slower queries. Below `min_vectors` the search is exact.
+
+    Data and persistence are the ones of SimpleVectorStore, so it loads from and persists to the same files.
+    The IVF index is built on the first query, new nodes are assigned to their closest list as they are added
+    and the clustering is trained again once the store has doubled in size.
+    """
+
+    nlist: int | None = None
+    nprobe: int = 8
+    min_vectors: int = 1024
+    train_iterations: int = 10
+
+    _ids: list[str] = PrivateAttr(default_factory=list)
+    _id_set: set[str] = PrivateAttr(default_factory=set)
+    _matrix: np.ndarray | None = PrivateAttr(default=None)
+    _centroids: np.ndarray | None = PrivateAttr(default=None)
+    _lists: list[np.ndarray] = PrivateAttr(default_factory=list)
+    _trained_size: int = PrivateAttr(default=0)
+    _dirty: bool = PrivateAttr(default=True)
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+
+    def __init__(
+        self,
+        data=None,
+        fs=None,
+        nlist: int | None = SETTINGS.ann_nlist,
+        nprobe: int = SETTINGS.ann_nprobe,
+        min_vectors: int = SETTINGS.ann_min_vectors,
+        **kwargs: Any,
+    ):
+        super().__init__(data=data, fs=fs)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_vectors = min_vectors
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "IVFVectorStore"
+
+    @classmethod
+    def from_simple_vector_store(cls, vector_store: SimpleVectorStore, **kwargs: Any) -> "IVFVectorStore":
+        return cls(data=vector_store.data, **kwargs)
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> list[str]:
+        node_ids = super().add(nodes, **add_kwargs)
+        with self._lock:
+            if not self._dirty and nodes:
+                self._append(node_ids, [node.get_embedding() for node in nodes])
+        return node_ids
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        super().delete(ref_doc_id, **delete_kwargs)
+        self._dirty = True
+
+    def delete_nodes(self, node_ids=None, filters=None, **delete_kwargs: Any) -> None:
+        super().delete_nodes(node_ids, filters, **delete_kwargs)
+        self._dirty = True
+
+    def clear(self) -> None:
+        super().clear()
+        self._dirty = True
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        # Filtros, restricciones por id y modos MMR/learner los resuelve SimpleVectorStore
+        if query.filters is not None or query.node_ids is not None or query.mode != VectorStoreQueryMode.DEFAULT:
+            return super().query(query, **kwargs)
+
+        with self._lock:
+            if self._dirty:
+                self._build()
+            if self._matrix is None or not self._ids:
+                return VectorStoreQueryResult(similarities=[], ids=[])
+
+            query_vector = np.asarray(query.query_embedding, dtype=np.float32)
+            query_vector /= np.linalg.norm(query_vector) or 1.0
+
+            if self._centroids is None:
+                candidates = np.arange(len(self._ids))
+            else:
+                nprobe = min(self.nprobe, len(self._centroids))
+                closest_lists = np.argpartition(-(self._centroids @ query_vector), nprobe - 1)[:nprobe]
+                candidates = np.concatenate([self._lists[index] for index in closest_lists])
+
+            scores = self._matrix[candidates] @ query_vector
+            top_k = min(query.similarity_top_k, len(candidates))
+            if top_k == 0:
+                return VectorStoreQueryResult(similarities=[], ids=[])
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            top = top[np.argsort(-scores[top])]
+            return VectorStoreQueryResult(
+                similarities=scores[top].tolist(),
+                ids=[self._ids[candidates[index]] for index in top],
+            )
+
+    def _build(self):
+        self._ids = list(self.data.embedding_dict)
+        self._id_set = set(self._ids)
+        self._matrix = None
+        self._centroids = None
+        self._lists = []
+        if self._ids:
+            self._matrix = normalize_rows(
+                np.asarray([self.data.embedding_dict[node_id] for node_id in self._ids], dtype=np.float32)
+            )
+            if len(self._ids) >= self.min_vectors:
+                self._train()
+        self._trained_size = len(self._ids)
+        self._dirty = False
+
+    def _train(self):
+        self._centroids, assignments = train_ivf(self._matrix, self.nlist, self.train_iterations)
+        self._lists = [np.flatnonzero(assignments == index) for index in range(len(self._centroids))]
+
+    def _append(self, node_ids: list[str], embeddings: list[list[float]]):
+        # Un id que ya existia se reemplaza, se reconstruye todo en la siguiente consulta
+        if self._matrix is None or not self._id_set.isdisjoint(node_ids):
+            self._dirty = True
+            return
+        vectors = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        start = len(self._ids)
+        self._ids.extend(node_ids)
+        self._id_set.update(node_ids)
+        self._matrix = np.vstack([self._matrix, vectors])
+
+        if len(self._ids) >= 2 * max(self._trained_size, self.min_vectors // 2):
+            self._dirty = True
+        elif self._centroids is not None:
+            assignments = np.argmax(vectors @ self._centroids.T, axis=1)
+            for offset, index in enumerate(assignments):
+                self._lists[index] = np.append(self._lists[index], start + offset)
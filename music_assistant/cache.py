@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import functools
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+
+def locked_cache(fn: Callable) -> Callable:
+    """
+    `functools.cache` for heavy resources (models, indexes, clients): when several threads ask for a value
+    that isn't built yet (e.g. the background warm-up and the first chat message), it is built once and
+    the other callers wait for it instead of building their own copy.
+    """
+    values: dict[tuple, Any] = {}
+    locks: dict[tuple, threading.Lock] = {}
+    locks_guard = threading.Lock()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        if key in values:
+            return values[key]
+        with locks_guard:
+            lock = locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in values:
+                values[key] = fn(*args, **kwargs)
+            return values[key]
+
+    wrapper.cache_clear = values.clear
+    return wrapper
+
+
+class TTLCache:
+    """
+    Two-tier cache: a bounded in-memory LRU in front of a SQLite file on disk.
+    Every entry carries its own time-to-live, values must be JSON serializable.
+    """
+
+    def __init__(self, namespace: str, path: str | None = None, max_entries: int = 1024):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value: Any, ttl: float):
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), expires_at),
+                )
+                self._db.commit()
+
+    def scan(self, prefix: str = "") -> list[tuple[str, Any]]:
+        """
+        Every entry whose key starts with `prefix` and has not expired, from memory and disk.
+        """
+        now = time.time()
+        with self._lock:
+            entries = {
+                key: value for key, (expires_at, value) in self._memory.items()
+                if key.startswith(prefix) and expires_at > now
+            }
+            rows = []
+            if self._db is not None:
+                rows = self._db.execute(
+                    "SELECT key, value FROM cache WHERE namespace = ? AND substr(key, 1, ?) = ? AND expires_at > ?",
+                    (self.namespace, len(prefix), prefix, now),
+                ).fetchall()
+        for key, value in rows:
+            if key not in entries:
+                entries[key] = json.loads(value)
+        return list(entries.items())
+
+    def invalidate(self, key: str | None = None):
+        with self._lock:
+            if key is None:
+                self._memory.clear()
+                if self._db is not None:
+                    self._db.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+            else:
+                self._memory.pop(key, None)
+                if self._db is not None:
+                    self._db.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+                    )
+            if self._db is not None:
+                self._db.commit()
+
+    def purge_expired(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?",
+                    (self.namespace, time.time()),
+                )
+                self._db.commit()
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _remember(self, key: str, expires_at: float, value: Any):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -1,24 +1,63 @@
+from time import perf_counter
+
+_import_start = perf_counter()
+
 import gradio as gr
-from music_assistant.objects import SpotifyObject
 from music_assistant.prompts import agent_prompt_tpl
-from music_assistant.agent import MusicAgent
+from music_assistant.agent import MusicAgent, astream_agent_response
+from music_assistant.sessions import AgentSessionPool
+from music_assistant.router import IntentRouter
+from music_assistant.rags import get_embed_model
 from music_assistant.config import get_agent_settings
-from music_assistant.tools import get_user_information_from_Spotify
+from music_assistant.tools import get_user_information_from_Spotify, set_spotify_credentials, tool_registry
 from llama_index.core.tools import FunctionTool
+from llama_index.core.llms import ChatMessage
 
 from music_assistant.utils import save_user_information
 SETTINGS = get_agent_settings()
-agent = MusicAgent(agent_prompt_tpl).get_agent()
+tool_registry.record("imports", perf_counter() - _import_start)
+
+# Un agente por sesion de Gradio, comparten herramientas, LLM y modelo de embeddings
+session_pool = AgentSessionPool(
+    lambda: MusicAgent(
+        agent_prompt_tpl, registry=tool_registry, memory_token_limit=SETTINGS.session_memory_token_limit
+    ).get_agent(),
+    max_sessions=SETTINGS.session_max_agents,
+    idle_ttl=SETTINGS.session_idle_ttl,
+)
 
-spotify_object = SpotifyObject()
+intent_router = IntentRouter(get_embed_model, threshold=SETTINGS.router_threshold, margin=SETTINGS.router_margin)
 
-def agent_response(message, history):
-    return agent.chat(message).response
+def get_agent(request: gr.Request | None = None):
+    return session_pool.get_agent(request.session_hash if request is not None else "default")
+
+def route_message(agent, message):
+    if not SETTINGS.router_enabled:
+        return None
+    response = intent_router.route(message)
+    if response is not None:
+        # El agente tiene que ver el intercambio para entender lo que el usuario pregunte despues
+        agent.memory.put(ChatMessage(role="user", content=message))
+        agent.memory.put(ChatMessage(role="assistant", content=response))
+    return response
+
+async def astream_response(message, history, request: gr.Request):
+    agent = get_agent(request)
+    response = route_message(agent, message)
+    if response is not None:
+        yield response
+        return
+    # No ocupa un hilo de Gradio mientras espera al LLM o a las herramientas
+    async for partial_response in astream_agent_response(agent, message, SETTINGS.chat_show_tool_calls):
+        yield partial_response
 
 
 if __name__ == "__main__":
-    spotify_object.set_spotify_credentials(SETTINGS.client_id, SETTINGS.client_secret, SETTINGS.redirect_uri)
-    get_user_information_from_Spotify()
-    demo = gr.ChatInterface(agent_response, type="messages")
+    # Las credenciales van al token_manager compartido, el mismo que usan las herramientas
+    set_spotify_credentials(SETTINGS.client_id, SETTINGS.client_secret, SETTINGS.redirect_uri)
+    tool_registry.warm_up()
+    with tool_registry.phase("user_information"):
+        get_user_information_from_Spotify()
+    demo = gr.ChatInterface(astream_response, type="messages", concurrency_limit=SETTINGS.chat_concurrency_limit)
+    print(tool_registry.timing_report())
     demo.launch()
-
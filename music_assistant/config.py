@@ -9,7 +9,8 @@ load_dotenv()
 class AgentSettings(BaseSettings):
     openai_model: str = "gpt4o-mini"
     hf_embeddings_model: str = "intfloat/multilingual-e5-base"
-    music_assistant_store_path: str = "libros_embeddings"
+    music_assistant_store_path: str = ".cache/libros_embeddings"  # symlink a la ultima version ingerida
+    music_assistant_seed_path: str = "libros_embeddings"  # store incluido en el repo, solo se lee
     music_assistant_data_path: str = "data"
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "default_openai_key")  # Cambia el valor por defecto si es necesario
     log_file: str = ".json"
@@ -19,6 +20,73 @@ class AgentSettings(BaseSettings):
     redirect_uri: str = os.getenv("REDIRECT_URI", "http://127.0.0.1:7860/")  # Cambia el valor por defecto si es necesario
     spotify_scope: str = os.getenv("SPOTIFY_SCOPE", "default_scope")  # Cambia el valor por defecto si es necesario
     username: str = os.getenv("USERNAME", "default_username")  # Cambia el valor por defecto si es necesario
+    cache_path: str = ".cache/music_assistant.sqlite"
+    spotify_cache_size: int = 2048
+    spotify_metadata_ttl: int = 7 * 24 * 60 * 60  # artistas, albumes y canciones cambian muy poco
+    spotify_search_ttl: int = 10 * 60
+    spotify_rate_limit: float = 10.0  # peticiones por segundo a la API de Spotify, compartidas por todo el proceso
+    spotify_burst: int = 20
+    spotify_max_retries: int = 4
+    spotify_backoff_base: float = 0.5
+    spotify_backoff_max: float = 30.0
+    spotify_pool_size: int = 16
+    spotify_timeout: float = 10.0
+    spotify_token_cache_dir: str = ".cache/spotify_tokens"  # un archivo de tokens por usuario
+    spotify_token_refresh_margin: int = 5 * 60  # se renueva el token antes de que le queden estos segundos
+    spotify_token_check_interval: int = 60
+    wikipedia_language: str = "en"
+    wikipedia_refresh_ttl: int = 7 * 24 * 60 * 60
+    wikipedia_token_budget: int = 1500
+    wikipedia_pool_size: int = 8
+    lyrics_ttl: int = 30 * 24 * 60 * 60
+    lyrics_negative_ttl: int = 24 * 60 * 60  # canciones sin letra, se reintenta antes
+    lyrics_max_workers: int = 4
+    paging_max_workers: int = 4
+    user_top_tracks_limit: int = 100  # por rango de tiempo
+    user_store_path: str = "user_snapshots.sqlite"
+    saved_snapshots_limit: int = 5
+    digest_top_k: int = 30
+    digest_token_budget: int = 1500
+    digest_snapshots_limit: int = 50
+    recommender_genre_weight: float = 0.5  # peso de los generos frente al artista en el recomendador local
+    recommender_max_per_artist: int = 3
+    recommender_cache_rescan: int = 10 * 60  # cada cuanto se agregan las respuestas de Spotify cacheadas
+    taste_genre_weight: float = 0.5  # peso de los generos frente a los artistas en el vector de gustos
+    taste_neighbours: int = 5  # usuarios mas parecidos que se usan para sugerir artistas
+    drift_months: int = 24  # meses de la serie de generos que se conservan por usuario
+    drift_top_k: int = 10
+    embed_batch_size: int = 32
+    embed_num_threads: int | None = None  # None: lo que decida torch
+    embed_cache_size: int = 4096
+    embed_cache_persist: bool = False
+    embed_cache_ttl: int = 30 * 24 * 60 * 60
+    vector_backend: str = "ivf"  # "ivf", "mmap" (snapshot binario) o "simple" (busqueda exhaustiva de llama-index)
+    snapshot_quantize: bool = False  # embeddings int8 en el snapshot binario
+    ann_nlist: int | None = None  # None: sqrt(numero de vectores)
+    ann_nprobe: int = 8
+    ann_min_vectors: int = 1024
+    rag_top_k: int = 2
+    ingest_workers: int | None = None  # None: numero de CPUs
+    ingest_keep_versions: int = 2  # versiones del store que se conservan despues de cada ingesta
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.95  # similitud coseno minima entre preguntas para reutilizar la respuesta
+    semantic_cache_ttl: int = 24 * 60 * 60
+    semantic_cache_size: int = 512
+    chat_show_tool_calls: bool = True  # muestra "Calling tool X" mientras el agente trabaja
+    chat_concurrency_limit: int | None = 16  # chats simultaneos en Gradio, None: sin limite
+    agent_mode: str = "react"  # "react" o "function_calling" (llamadas a herramientas en paralelo)
+    agent_max_function_calls: int = 10
+    tool_retrieval: bool = False  # solo las herramientas relevantes para el mensaje en cada paso
+    tool_retrieval_top_k: int = 4
+    tool_retrieval_always_include: list[str] = ["read_saved_user_Spotify_information", "search_Spotify"]
+    tool_output_token_budget: int = 1500  # tokens maximos de la salida de una herramienta para el agente
+    tool_output_token_budgets: dict[str, int] = {"show_specific_Spotify_playlist_tracks": 3000}
+    router_enabled: bool = True  # responde peticiones simples (ver playlists) sin pasar por el agente
+    router_threshold: float = 0.9
+    router_margin: float = 0.03  # ventaja minima sobre la segunda intencion mas parecida
+    session_max_agents: int = 100  # sesiones con agente propio al mismo tiempo
+    session_idle_ttl: int = 30 * 60
+    session_memory_token_limit: int = 3000  # historial de chat por sesion
 
     class Config:
         env_file = ".env"
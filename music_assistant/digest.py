@@ -0,0 +1,97 @@
+import threading
+from music_assistant.models import UserInformation
+from music_assistant.store import get_store_version, read_snapshots
+from music_assistant.config import get_agent_settings
+from music_assistant.utils import estimate_tokens
+
+SETTINGS = get_agent_settings()
+
+# Peso de un snapshot segun su antiguedad: el mas reciente vale 1, el anterior RECENCY_DECAY, ...
+RECENCY_DECAY = 0.8
+
+# (username, top_k, token_budget) -> (version del store, digest)
+_digest_cache: dict[tuple, tuple[tuple, str]] = {}
+_digest_cache_lock = threading.Lock()
+
+
+def score_ranked_items(ranked_lists: list[list]) -> dict:
+    """
+    `ranked_lists` go from oldest to newest snapshot. An item scores more the more snapshots it appears in,
+    the more recent those snapshots are and the higher it is ranked in each of them.
+    """
+    scores = {}
+    for age, items in enumerate(reversed(ranked_lists)):
+        weight = RECENCY_DECAY ** age
+        for rank, item in enumerate(items):
+            scores[item] = scores.get(item, 0.0) + weight * (1 - rank / len(items))
+    return scores
+
+
+def build_profile_digest(snapshots: list[UserInformation], top_k: int = SETTINGS.digest_top_k, token_budget: int = SETTINGS.digest_token_budget) -> str:
+    """
+    Merges the snapshots into one de-duplicated profile and emits the top-k tracks, artists and genres,
+    ranked by frequency and recency, without going over `token_budget`.
+    """
+    tracks = {}
+    artists = {}
+    for snapshot in snapshots:
+        for track in snapshot.top_tracks.top_tracks:
+            tracks[track.id] = track
+        for artist in snapshot.top_artists.top_artists:
+            artists[artist.id] = artist
+
+    track_scores = score_ranked_items([[track.id for track in snapshot.top_tracks.top_tracks] for snapshot in snapshots])
+    artist_scores = score_ranked_items([[artist.id for artist in snapshot.top_artists.top_artists] for snapshot in snapshots])
+    genre_scores = score_ranked_items([snapshot.top_genres.top_genres for snapshot in snapshots])
+
+    sections = [
+        (
+            "Top Tracks (ID | Name | Artist)",
+            [f"{track_id} | {tracks[track_id].name} | {tracks[track_id].artist}" for track_id in sorted(track_scores, key=track_scores.get, reverse=True)[:top_k]],
+            0.5,
+        ),
+        (
+            "Top Artists (ID | Name | Genres)",
+            [f"{artist_id} | {artists[artist_id].name} | {', '.join(artists[artist_id].genres or [])}" for artist_id in sorted(artist_scores, key=artist_scores.get, reverse=True)[:top_k]],
+            0.3,
+        ),
+        (
+            "Top Genres",
+            [", ".join(sorted(genre_scores, key=genre_scores.get, reverse=True)[:top_k])],
+            0.2,
+        ),
+    ]
+
+    lines = [
+        f"User Spotify Information (digest of {len(snapshots)} snapshots, "
+        f"{snapshots[0].date.isoformat()} to {snapshots[-1].date.isoformat()}):",
+    ]
+    for title, section_lines, share in sections:
+        lines.append(f"\n{title}:")
+        remaining = int(token_budget * share)
+        for line in section_lines:
+            tokens = estimate_tokens(line)
+            if tokens > remaining:
+                break
+            lines.append(line)
+            remaining -= tokens
+    return "\n".join(lines)
+
+
+def get_profile_digest(username: str, top_k: int = SETTINGS.digest_top_k, token_budget: int = SETTINGS.digest_token_budget) -> str | None:
+    """
+    Memoized on the store version of the user, repeated reads only cost the version lookup.
+    Returns None if the user has no saved snapshots.
+    """
+    key = (username, top_k, token_budget)
+    version = get_store_version(username)
+    with _digest_cache_lock:
+        cached = _digest_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    snapshots = read_snapshots(username, limit=SETTINGS.digest_snapshots_limit)
+    digest = build_profile_digest(snapshots, top_k, token_budget) if snapshots else None
+    with _digest_cache_lock:
+        _digest_cache[key] = (version, digest)
+    return digest
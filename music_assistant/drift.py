@@ -0,0 +1,203 @@
+import threading
+from datetime import date, datetime
+from pydantic import BaseModel
+from music_assistant.models import UserInformation
+from music_assistant.store import (
+    add_snapshot_listener,
+    count_snapshots_until,
+    get_last_saved,
+    read_drift_state,
+    read_snapshots_after,
+    save_drift_state,
+)
+from music_assistant.config import get_agent_settings
+
+SETTINGS = get_agent_settings()
+
+
+class RankedItems(BaseModel):
+    date: date
+    tracks: dict[str, int]  # id -> posicion
+    artists: dict[str, int]
+    genres: dict[str, float]  # genero -> fraccion del snapshot
+
+
+class GenreMonth(BaseModel):
+    snapshots: int = 0
+    shares: dict[str, float] = {}  # suma de las fracciones de los snapshots del mes
+
+
+class TasteDriftState(BaseModel):
+    """
+    Everything the drift analytics need for a user, updated with each snapshot instead of read from the
+    history: the first, previous and latest snapshots, the month buckets of the genre-share series
+    (at most `drift_months`), the date each track and artist first appeared and the names of the
+    tracks and artists of the kept snapshots. Its size depends on the catalogue, not on the number of snapshots.
+    """
+
+    username: str
+    snapshots: int = 0
+    last_applied: tuple[date, datetime] | None = None  # (date, created_at) del ultimo snapshot aplicado
+    last_saved: datetime | None = None  # created_at mas reciente de los snapshots aplicados
+    first: RankedItems | None = None
+    previous: RankedItems | None = None
+    latest: RankedItems | None = None
+    genre_months: dict[str, GenreMonth] = {}  # "YYYY-MM" -> medias de ese mes
+    first_seen: dict[str, date] = {}
+    names: dict[str, str] = {}
+
+
+def genre_shares(information: UserInformation) -> dict[str, float]:
+    """
+    Fraction of the snapshot that belongs to each genre: every top artist counts 1, split between its genres.
+    Without artist genres, the top genres count 1 each.
+    """
+    shares = {}
+    for artist in information.top_artists.top_artists:
+        for genre in artist.genres or []:
+            shares[genre] = shares.get(genre, 0.0) + 1 / len(artist.genres)
+    if not shares:
+        shares = {genre: 1.0 for genre in information.top_genres.top_genres}
+    total = sum(shares.values()) or 1.0
+    return {genre: share / total for genre, share in shares.items()}
+
+
+def apply_snapshot(state: TasteDriftState, information: UserInformation):
+    """
+    Folds a snapshot newer than (or as new as) `state.latest` into the state.
+    """
+    items = RankedItems(
+        date=information.date,
+        tracks={song.id: rank for rank, song in enumerate(information.top_tracks.top_tracks)},
+        artists={artist.id: rank for rank, artist in enumerate(information.top_artists.top_artists)},
+        genres=genre_shares(information),
+    )
+    if state.first is None:
+        state.first = items
+    state.previous, state.latest = state.latest, items
+    state.snapshots += 1
+
+    for song in information.top_tracks.top_tracks:
+        state.first_seen.setdefault(song.id, information.date)
+        state.names[song.id] = f"{song.name} - {song.artist}"
+    for artist in information.top_artists.top_artists:
+        state.first_seen.setdefault(artist.id, information.date)
+        state.names[artist.id] = artist.name
+    # Solo se guardan los nombres que se pueden mostrar
+    kept = [ranked for ranked in (state.first, state.previous, state.latest) if ranked is not None]
+    state.names = {
+        item_id: name for item_id, name in state.names.items()
+        if any(item_id in ranked.tracks or item_id in ranked.artists for ranked in kept)
+    }
+
+    month = state.genre_months.setdefault(information.date.strftime("%Y-%m"), GenreMonth())
+    month.snapshots += 1
+    for genre, share in items.genres.items():
+        month.shares[genre] = month.shares.get(genre, 0.0) + share
+    for old_month in sorted(state.genre_months)[:-SETTINGS.drift_months]:
+        del state.genre_months[old_month]
+
+
+class DriftTracker:
+    """
+    Keeps the `TasteDriftState` of each user up to date as snapshots are saved and persists it in the store,
+    so a query never reads the snapshot history. A query only compares when the user's last snapshot was saved
+    with the one the state has seen. When they differ, snapshots were saved while no tracker was listening:
+    the ones that sort after the last applied `(date, created_at)` are read and applied, and one that sorts
+    before it rebuilds the user's state.
+    """
+
+    def __init__(self):
+        self._states: dict[str, TasteDriftState] = {}
+        self._lock = threading.RLock()
+
+    def _load(self, username: str) -> TasteDriftState:
+        state = self._states.get(username)
+        if state is None:
+            stored = read_drift_state(username)
+            state = TasteDriftState.model_validate_json(stored) if stored else TasteDriftState(username=username)
+            self._states[username] = state
+        return state
+
+    def get_state(self, username: str) -> TasteDriftState:
+        """
+        The user's state with every stored snapshot applied. Without new snapshots it costs one lookup of the
+        latest `created_at`. Otherwise only the snapshots saved after the last applied one are read. If a snapshot older than that one was saved since, the state is rebuilt from the history.
+        """
+        with self._lock:
+            state = self._load(username)
+            last_saved = get_last_saved(username)
+            if last_saved == state.last_saved:
+                return state
+            if state.snapshots and (
+                state.last_applied is None or count_snapshots_until(username, state.last_applied) != state.snapshots
+            ):
+                state = TasteDriftState(username=username)
+                self._states[username] = state
+            snapshots = read_snapshots_after(username, state.last_applied)
+            for key, information in snapshots:
+                apply_snapshot(state, information)
+                state.last_applied = key
+                state.last_saved = max(state.last_saved or key[1], key[1])
+            if snapshots:
+                save_drift_state(username, state.model_dump_json())
+            return state
+
+    def add_snapshot(self, information: UserInformation):
+        self.get_state(information.username)
+
+
+def _rank_changes(state: TasteDriftState, kind: str, since: RankedItems, top_k: int) -> list[str]:
+    latest, before = getattr(state.latest, kind), getattr(since, kind)
+    moved = [(item_id, before[item_id] - rank) for item_id, rank in latest.items() if item_id in before and before[item_id] != rank]
+    moved.sort(key=lambda item: abs(item[1]), reverse=True)
+    return [f"{state.names.get(item_id, item_id)} | {latest[item_id] + 1} | {change:+d}" for item_id, change in moved[:top_k]]
+
+
+def _new_and_dropped(state: TasteDriftState, kind: str, top_k: int) -> list[str]:
+    latest, previous = getattr(state.latest, kind), getattr(state.previous, kind)
+    new = [item_id for item_id in latest if item_id not in previous and state.first_seen.get(item_id) == state.latest.date]
+    dropped = [item_id for item_id in previous if item_id not in latest]
+    lines = []
+    for label, item_ids in ((f"New {kind}", new), (f"Dropped {kind}", dropped)):
+        if item_ids:
+            names = ", ".join(state.names.get(item_id, item_id) for item_id in item_ids[:top_k])
+            more = f" (+{len(item_ids) - top_k} more)" if len(item_ids) > top_k else ""
+            lines.append(f"{label}: {names}{more}")
+    return lines
+
+
+def format_drift(state: TasteDriftState, top_k: int = SETTINGS.drift_top_k) -> str:
+    """
+    Compact report of how the user's taste changed: rank movers and new and dropped items against the
+    previous snapshot, rank movers since the first snapshot and the monthly genre shares of the top genres.
+    """
+    if state.latest is None:
+        return "Error: No saved user data found."
+    lines = [f"Taste drift | {state.username} | {state.snapshots} snapshots | {state.first.date} -> {state.latest.date}"]
+
+    for kind in ("artists", "tracks"):
+        if state.previous is not None:
+            changes = _rank_changes(state, kind, state.previous, top_k)
+            if changes:
+                lines.append(f"{kind.capitalize()} vs {state.previous.date} (Name | Rank | Change)")
+                lines.extend(changes)
+            lines.extend(_new_and_dropped(state, kind, top_k))
+        changes = _rank_changes(state, kind, state.first, top_k) if state.snapshots > 2 else []
+        if changes:
+            lines.append(f"{kind.capitalize()} vs first snapshot {state.first.date} (Name | Rank | Change)")
+            lines.extend(changes)
+
+    months = sorted(state.genre_months)
+    top_genres = sorted(state.latest.genres, key=state.latest.genres.get, reverse=True)[:5]
+    if top_genres:
+        lines.append(f"Genre share by month (Month | {' | '.join(top_genres)})")
+        for month in months:
+            bucket = state.genre_months[month]
+            shares = [f"{bucket.shares.get(genre, 0.0) / bucket.snapshots:.0%}" for genre in top_genres]
+            lines.append(f"{month} | {' | '.join(shares)}")
+    return "\n".join(lines)
+
+
+drift_tracker = DriftTracker()
+add_snapshot_listener(drift_tracker.add_snapshot)
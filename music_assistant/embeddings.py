@@ -0,0 +1,76 @@
+import unicodedata
+from typing import Any
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from music_assistant.cache import TTLCache
+from music_assistant.config import get_agent_settings
+
+SETTINGS = get_agent_settings()
+
+
+def normalize_embedding_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps an embedding model so each (model, kind, normalized text) is only embedded once.
+    Query and text embeddings are cached separately, e5 models embed them with different prefixes.
+    The persistent tier is only used when `path` is given.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: TTLCache = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, max_entries: int = 4096, path: str | None = None, **kwargs: Any):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs,
+        )
+        self._inner = inner
+        self._cache = TTLCache("embeddings", path, max_entries=max_entries)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def cache_stats(self) -> dict:
+        return self._cache.stats()
+
+    def _key(self, kind: str, text: str) -> str:
+        return f"{self.model_name}:{kind}:{normalize_embedding_text(text)}"
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        key = self._key("query", query)
+        embedding = self._cache.get(key)
+        if embedding is None:
+            embedding = self._inner.get_query_embedding(query)
+            self._cache.set(key, embedding, SETTINGS.embed_cache_ttl)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        key = self._key("query", query)
+        embedding = self._cache.get(key)
+        if embedding is None:
+            embedding = await self._inner.aget_query_embedding(query)
+            self._cache.set(key, embedding, SETTINGS.embed_cache_ttl)
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        keys = [self._key("text", text) for text in texts]
+        embeddings = [self._cache.get(key) for key in keys]
+        missing = {}
+        for index, embedding in enumerate(embeddings):
+            if embedding is None:
+                missing.setdefault(keys[index], texts[index])
+        if missing:
+            # Un solo batch al modelo con todos los textos distintos que no estaban en cache
+            new_embeddings = dict(zip(missing, self._inner.get_text_embedding_batch(list(missing.values()))))
+            for key, embedding in new_embeddings.items():
+                self._cache.set(key, embedding, SETTINGS.embed_cache_ttl)
+            embeddings = [new_embeddings.get(key, embedding) for key, embedding in zip(keys, embeddings)]
+        return embeddings
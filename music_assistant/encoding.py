@@ -0,0 +1,157 @@
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from pydantic import BaseModel
+from music_assistant.models import (
+    Playlist,
+    PlaylistWithTracks,
+    Song,
+    Artist,
+    Album,
+    UserInformation,
+)
+from music_assistant.utils import estimate_tokens
+
+# Formato compacto de las salidas de las herramientas, una tabla por lista:
+#   Playlist 37i9dQZF1DX | 100 tracks
+#   Artists: A1=Charli XCX; A2=Troye Sivan
+#   ID | Name | Artist
+#   2x8evxqUlF0eRabbW2JBJd | Von dutch | A1
+#   ... 60 more items, IDs only: 4h9wh7iOZ0GGn8QVp4RAOB, 1Fid2jjqsHViMX6xNH70hE, ...
+# Los artistas que se repiten se escriben una vez y se referencian por alias.
+# Las filas que no caben en el presupuesto pierden todas las columnas menos el ID, que no se recorta nunca:
+# el agente los necesita para armar playlists.
+
+
+def _song_artist_aliases(songs: Iterable[Song]) -> dict[str, str]:
+    counts = Counter(song.artist for song in songs)
+    repeated = [artist for artist, count in counts.most_common() if count > 1]
+    return {artist: f"A{index}" for index, artist in enumerate(repeated, start=1)}
+
+
+def _alias_line(aliases: dict[str, str]) -> list[str]:
+    if not aliases:
+        return []
+    return ["Artists: " + "; ".join(f"{alias}={artist}" for artist, alias in aliases.items())]
+
+
+def _song_rows(songs: Iterable[Song], aliases: dict[str, str]) -> Iterator[str]:
+    for song in songs:
+        yield f"{song.id} | {song.name} | {aliases.get(song.artist, song.artist)}"
+
+
+def _artist_rows(artists: Iterable[Artist]) -> Iterator[str]:
+    for artist in artists:
+        yield f"{artist.id} | {artist.name} | {', '.join(artist.genres or [])}"
+
+
+class _Budget:
+    def __init__(self, token_budget: int):
+        self.remaining = token_budget
+        self.lines: list[str] = []
+
+    def add(self, line: str) -> bool:
+        tokens = estimate_tokens(line) + 1
+        if tokens > self.remaining:
+            return False
+        self.lines.append(line)
+        self.remaining -= tokens
+        return True
+
+    def add_rows(self, rows: Iterator[str], total: int, ids: list[str] | None = None):
+        written = 0
+        for row in rows:
+            # Se reserva espacio para el marcador de items restantes
+            if self.remaining < estimate_tokens(row) + 8 and written < total - 1:
+                break
+            if not self.add(row):
+                break
+            written += 1
+        if written < total and ids is None:
+            self.lines.append(f"... {total - written} more items")
+        elif written < total:
+            line = f"... {total - written} more items, IDs only: {', '.join(ids[written:])}"
+            self.lines.append(line)
+            self.remaining -= estimate_tokens(line) + 1
+
+
+def _table(budget: _Budget, title: list[str], header: str, rows: Iterator[str], ids: list[str]):
+    for line in title:
+        budget.add(line)
+    budget.add(header)
+    budget.add_rows(rows, len(ids), ids)
+
+
+def encode_tool_output(value: object, token_budget: int) -> str:
+    """
+    Renders a tool result as compact text of at most about `token_budget` tokens. Lists become a table with a
+    header row, the rows past the budget are listed by ID only, so no identifier is ever dropped.
+    Rows are built straight from the model attributes.
+    Strings are returned as they are, the tools that return text already budget it.
+    """
+    if isinstance(value, str):
+        return value
+    budget = _Budget(token_budget)
+
+    if isinstance(value, PlaylistWithTracks):
+        aliases = _song_artist_aliases(value.tracks)
+        _table(
+            budget,
+            [f"Playlist {value.id} | {value.total} tracks", *_alias_line(aliases)],
+            "ID | Name | Artist",
+            _song_rows(value.tracks, aliases),
+            [song.id for song in value.tracks],
+        )
+        if value.lyrics:
+            names = {song.id: song.name for song in value.tracks}
+            budget.add("Lyrics:")
+            budget.add_rows(
+                (f"[{names.get(song_id, song_id)}]\n{lyrics}" for song_id, lyrics in value.lyrics.items() if lyrics),
+                sum(1 for lyrics in value.lyrics.values() if lyrics),
+            )
+    elif isinstance(value, Album):
+        aliases = _song_artist_aliases(value.tracks)
+        _table(
+            budget,
+            [f"Album {value.id} | {value.name} | {value.artist}", *_alias_line(aliases)],
+            "ID | Name | Artist",
+            _song_rows(value.tracks, aliases),
+            [song.id for song in value.tracks],
+        )
+    elif isinstance(value, UserInformation):
+        aliases = _song_artist_aliases(value.top_tracks.top_tracks)
+        _table(
+            budget,
+            [f"User {value.username} | {value.date}", *_alias_line(aliases), "Top Tracks"],
+            "ID | Name | Artist",
+            _song_rows(value.top_tracks.top_tracks, aliases),
+            [song.id for song in value.top_tracks.top_tracks],
+        )
+        _table(
+            budget, ["Top Artists"], "ID | Name | Genres",
+            _artist_rows(value.top_artists.top_artists), [artist.id for artist in value.top_artists.top_artists],
+        )
+        budget.add("Top Genres: " + ", ".join(value.top_genres.top_genres))
+    elif isinstance(value, Playlist):
+        _table(budget, [], "ID | Name | Tracks", iter([f"{value.id} | {value.name} | {value.num_tracks}"]), [value.id])
+    elif isinstance(value, Artist):
+        _table(budget, [], "ID | Name | Genres", _artist_rows([value]), [value.id])
+    elif isinstance(value, list) and value and all(isinstance(item, Playlist) for item in value):
+        _table(
+            budget, [], "ID | Name | Tracks",
+            (f"{playlist.id} | {playlist.name} | {playlist.num_tracks}" for playlist in value),
+            [playlist.id for playlist in value],
+        )
+    elif isinstance(value, list) and value and all(isinstance(item, Artist) for item in value):
+        _table(budget, [], "ID | Name | Genres", _artist_rows(value), [artist.id for artist in value])
+    elif isinstance(value, list) and value and all(isinstance(item, Song) for item in value):
+        aliases = _song_artist_aliases(value)
+        _table(budget, _alias_line(aliases), "ID | Name | Artist", _song_rows(value, aliases), [song.id for song in value])
+    elif isinstance(value, list) and value and all(isinstance(item, str) for item in value):
+        _table(budget, [], "URI", iter(value), value)
+    elif isinstance(value, list) and not value:
+        return "No results."
+    elif isinstance(value, BaseModel):
+        return value.model_dump_json()
+    else:
+        return str(value)
+    return "\n".join(budget.lines)
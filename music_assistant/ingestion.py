@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from llama_index.core import VectorStoreIndex, StorageContext, SimpleDirectoryReader, load_index_from_storage
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores import SimpleVectorStore
+from music_assistant.config import get_agent_settings
+from music_assistant.snapshot import convert_persist_dir
+
+SETTINGS = get_agent_settings()
+
+# relative path -> {"hash": sha256 del archivo, "doc_ids": documentos que genero}
+MANIFEST_FILENAME = "manifest.json"
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def node_hash(node: BaseNode) -> str:
+    # Mismo texto que recibe el modelo de embeddings (contenido + metadata embebible)
+    return hashlib.sha256(node.get_content(metadata_mode=MetadataMode.EMBED).encode("utf-8")).hexdigest()
+
+
+def scan_data_dir(data_dir: str) -> dict[str, str]:
+    files = {}
+    for root, _, filenames in os.walk(data_dir):
+        for filename in filenames:
+            if filename.startswith("."):
+                continue
+            path = os.path.join(root, filename)
+            files[os.path.relpath(path, data_dir)] = file_hash(path)
+    return files
+
+
+def load_manifest(store_path: str) -> dict:
+    path = os.path.join(store_path, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def parse_file(path: str) -> list[BaseNode]:
+    # Corre en un proceso aparte: leer y partir en chunks no necesita el modelo de embeddings
+    documents = SimpleDirectoryReader(input_files=[path], filename_as_id=True).load_data()
+    return SentenceSplitter().get_nodes_from_documents(documents)
+
+
+def publish_version(version_dir: str, store_path: str):
+    """
+    Points the `store_path` symlink to `version_dir` with a single rename, a reader either sees the old
+    or the new store. Only the last `ingest_keep_versions` versions next to `store_path` are kept.
+    """
+    if os.path.isdir(store_path) and not os.path.islink(store_path):
+        raise ValueError(
+            f"{store_path} is a directory, the store path must be a symlink managed by the ingestion. "
+            "Set music_assistant_seed_path to it and music_assistant_store_path to a new location."
+        )
+    tmp_link = f"{store_path}.link"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(os.path.basename(version_dir), tmp_link)
+    os.replace(tmp_link, store_path)
+
+    # Se conservan las ultimas versiones, algun proceso todavia puede estar leyendo la anterior
+    parent, name = os.path.split(store_path)
+    versions = sorted(
+        (entry for entry in os.listdir(parent or ".") if entry.startswith(name + ".") and entry != f"{name}.link"),
+        key=lambda entry: os.path.getmtime(os.path.join(parent, entry)),
+    )
+    for entry in versions[:-SETTINGS.ingest_keep_versions]:
+        shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def new_version_dir(store_path: str) -> str:
+    store_path = os.path.normpath(store_path)
+    os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+    return f"{store_path}.{time.time_ns()}"
+
+
+def seed_store(store_path: str, seed_path: str):
+    """
+    Creates the store at `store_path` from a copy of `seed_path`. The seed (the store tracked in the repo)
+    is only read, ingestion never writes to it.
+    """
+    version_dir = new_version_dir(store_path)
+    shutil.copytree(seed_path, version_dir)
+    publish_version(version_dir, os.path.normpath(store_path))
+
+
+def persist_atomically(index: VectorStoreIndex, store_path: str, manifest: dict):
+    """
+    Persists the index to a new versioned directory next to `store_path` and publishes it, see `publish_version`.
+    """
+    version_dir = new_version_dir(store_path)
+    index.storage_context.persist(persist_dir=version_dir)
+    with open(os.path.join(version_dir, MANIFEST_FILENAME), "w") as file:
+        json.dump(manifest, file)
+    if SETTINGS.vector_backend == "mmap":
+        convert_persist_dir(version_dir)
+    publish_version(version_dir, os.path.normpath(store_path))
+
+
+def incremental_ingest(store_path: str, data_dir: str) -> bool:
+    """
+    Brings the store at `store_path` up to date with `data_dir`. Only new or changed files are parsed
+    (in a process pool), only chunks whose text is new are embedded, and nodes of changed or deleted
+    files are removed. Returns False if nothing changed.
+    """
+    manifest = load_manifest(store_path) if os.path.exists(store_path) else {}
+    files = scan_data_dir(data_dir)
+    changed = [path for path, digest in files.items() if manifest.get(path, {}).get("hash") != digest]
+    removed = [path for path in manifest if path not in files]
+    if os.path.exists(store_path) and not changed and not removed:
+        return False
+
+    index = VectorStoreIndex(nodes=[], storage_context=StorageContext.from_defaults(vector_store=SimpleVectorStore()))
+    reusable_embeddings = {}
+    if os.path.exists(store_path):
+        # Se edita sobre el formato JSON, el backend de consulta se elige al cargar
+        stored_index = load_index_from_storage(StorageContext.from_defaults(
+            persist_dir=store_path, vector_store=SimpleVectorStore.from_persist_dir(store_path)
+        ))
+        if manifest:
+            index = stored_index
+            doc_ids = [doc_id for path in changed + removed for doc_id in manifest.get(path, {}).get("doc_ids", [])]
+        else:
+            # Store creado antes del manifest: se reconstruye, pero reutilizando todos sus embeddings
+            doc_ids = list(stored_index.docstore.get_all_ref_doc_info() or {})
+
+        # Embeddings de los chunks que se van a borrar, se reutilizan si el mismo texto vuelve a aparecer
+        for doc_id in doc_ids:
+            ref_doc_info = stored_index.docstore.get_ref_doc_info(doc_id)
+            for node_id in ref_doc_info.node_ids if ref_doc_info else []:
+                node = stored_index.docstore.get_node(node_id, raise_error=False)
+                if node is not None and node_id in stored_index.vector_store.data.embedding_dict:
+                    reusable_embeddings[node_hash(node)] = stored_index.vector_store.get(node_id)
+            if manifest:
+                index.delete_ref_doc(doc_id, delete_from_docstore=True)
+    for path in removed:
+        manifest.pop(path)
+
+    with ProcessPoolExecutor(max_workers=SETTINGS.ingest_workers) as executor:
+        parsed_files = list(executor.map(parse_file, [os.path.abspath(os.path.join(data_dir, path)) for path in changed]))
+
+    nodes = []
+    for path, file_nodes in zip(changed, parsed_files):
+        for node in file_nodes:
+            node.embedding = reusable_embeddings.get(node_hash(node))
+        nodes.extend(file_nodes)
+        manifest[path] = {"hash": files[path], "doc_ids": sorted({node.ref_doc_id for node in file_nodes if node.ref_doc_id})}
+
+    # Solo se calculan embeddings de los nodos que no tienen uno
+    index.insert_nodes(nodes, show_progress=True)
+    persist_atomically(index, store_path, manifest)
+    print(f"ingested {len(changed)} files ({len(nodes)} chunks), removed {len(removed)} files")
+    return True
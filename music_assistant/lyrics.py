@@ -0,0 +1,78 @@
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+import lyricsgenius as lg
+from music_assistant.cache import TTLCache, locked_cache
+from music_assistant.config import get_agent_settings
+from music_assistant.models import Song
+
+SETTINGS = get_agent_settings()
+
+lyrics_cache = TTLCache("lyrics", SETTINGS.cache_path, max_entries=512)
+
+
+@locked_cache
+def get_genius() -> lg.Genius:
+    genius = lg.Genius(SETTINGS.genius_api_key)
+    genius.remove_section_headers = True
+    return genius
+
+
+def normalize_song_key(song_title: str, artist_name: str) -> str:
+    """
+    "Sympathy is a knife (feat. Ariana Grande) - Remix", "Charli XCX" -> "sympathy is a knife|charli xcx"
+    """
+    def normalize(text: str) -> str:
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+        text = re.sub(r"\(.*?\)|\[.*?\]", " ", text)
+        text = re.sub(r"\s+-\s+.*$", " ", text)
+        text = re.sub(r"['’]", "", text)
+        text = re.sub(r"[^\w\s]", " ", text)
+        return " ".join(text.split())
+
+    return f"{normalize(song_title)}|{normalize(artist_name)}"
+
+
+def fetch_lyrics(song_title: str, artist_name: str) -> str | None:
+    """
+    Looks up the lyrics in the local store before asking Genius. Songs without lyrics are remembered
+    for `lyrics_negative_ttl` seconds, request errors are not cached.
+    """
+    key = normalize_song_key(song_title, artist_name)
+    cached = lyrics_cache.get(key)
+    if cached is not None:
+        return cached["lyrics"]
+
+    try:
+        song = get_genius().search_song(song_title, artist_name)
+    except Exception as e:
+        print(f"Error fetching lyrics for {song_title} by {artist_name}: {e}")
+        return None
+
+    if song:
+        lyrics_cache.set(key, {"lyrics": song.lyrics}, SETTINGS.lyrics_ttl)
+        return song.lyrics
+    lyrics_cache.set(key, {"lyrics": None}, SETTINGS.lyrics_negative_ttl)
+    return None
+
+
+def fetch_lyrics_batch(songs: list[Song], max_workers: int = SETTINGS.lyrics_max_workers) -> dict[str, str | None]:
+    """
+    Fetches the lyrics of every song concurrently, returns a dict song id -> lyrics.
+    Songs that normalize to the same key are only looked up once.
+    """
+    songs_by_key: dict[str, list[Song]] = {}
+    for song in songs:
+        songs_by_key.setdefault(normalize_song_key(song.name, song.artist), []).append(song)
+
+    lyrics = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda same_songs: fetch_lyrics(same_songs[0].name, same_songs[0].artist),
+            songs_by_key.values(),
+        )
+        for same_songs, song_lyrics in zip(songs_by_key.values(), results):
+            for song in same_songs:
+                lyrics[song.id] = song_lyrics
+    return lyrics
@@ -31,6 +31,7 @@ class PlaylistWithTracks(BaseModel):
     id: str
     total: int
     tracks: list[Song]
+    lyrics: dict[str, str | None] | None = None  # song id -> letra
 
 class UserInformationTopTracks(BaseModel):
     num: int
@@ -44,9 +45,15 @@ class UserInformationTopGenres(BaseModel):
     num: int
     top_genres: list[str]
 
+class UserInformationTimeRange(BaseModel):
+    # ids ordenados por ranking dentro del rango de tiempo
+    top_track_ids: list[str]
+    top_artist_ids: list[str]
+
 class UserInformation(BaseModel):
     username: str
     date: date
     top_tracks: UserInformationTopTracks
     top_artists: UserInformationTopArtists
-    top_genres: UserInformationTopGenres
\ No newline at end of file
+    top_genres: UserInformationTopGenres
+    time_ranges: dict[str, UserInformationTimeRange] | None = None  # short_term, medium_term, long_term
\ No newline at end of file
@@ -1,25 +1,161 @@
+import os
+import json
+import time
+import threading
 import spotipy
+from spotipy.cache_handler import CacheFileHandler
 from spotipy.oauth2 import SpotifyOAuth
+from music_assistant.cache import TTLCache
 from music_assistant.config import get_agent_settings
+from music_assistant.spotify_http import RateLimitedSpotify, get_spotify_session
 
 SETTINGS = get_agent_settings()
 
-class SpotifyObject:
+# Endpoints de solo lectura que se pueden cachear, con su TTL en segundos.
+# Cualquier otro metodo (user_playlist_create, playlist_add_items, current_user_*, ...) pasa directo al cliente.
+CACHED_ENDPOINTS = {
+    "artist": SETTINGS.spotify_metadata_ttl,
+    "artists": SETTINGS.spotify_metadata_ttl,
+    "album": SETTINGS.spotify_metadata_ttl,
+    "album_tracks": SETTINGS.spotify_metadata_ttl,
+    "track": SETTINGS.spotify_metadata_ttl,
+    "tracks": SETTINGS.spotify_metadata_ttl,
+    "search": SETTINGS.spotify_search_ttl,
+}
+
+spotify_cache = TTLCache("spotify", SETTINGS.cache_path, max_entries=SETTINGS.spotify_cache_size)
+
+
+class CachedSpotify:
+    """
+    Wraps a `spotipy.Spotify` client so read-only metadata lookups are served from `spotify_cache`.
+    """
+
+    def __init__(self, sp: spotipy.Spotify, cache: TTLCache = spotify_cache):
+        self.sp = sp
+        self.cache = cache
+
+    def __getattr__(self, name):
+        attribute = getattr(self.sp, name)
+        if name not in CACHED_ENDPOINTS:
+            return attribute
+
+        def cached_call(*args, **kwargs):
+            key = name + ":" + json.dumps([args, kwargs], sort_keys=True, default=str)
+            result = self.cache.get(key)
+            if result is None:
+                result = attribute(*args, **kwargs)
+                if result is not None:
+                    self.cache.set(key, result, CACHED_ENDPOINTS[name])
+            return result
+
+        return cached_call
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+
+class SpotifyTokenManager:
+    """
+    Process-wide owner of the Spotify credentials and of one OAuth manager and client per username.
+    Tokens are cached per username in `spotify_token_cache_dir` and a background thread refreshes the ones
+    that expire within `spotify_token_refresh_margin` seconds, so a request never waits for a refresh.
+    Every client runs on the shared connection pool of RateLimitedSpotify.
+    """
+
     def __init__(self):
-        self.sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
-            client_id=SETTINGS.client_id,
-            client_secret=SETTINGS.client_secret,
-            redirect_uri=SETTINGS.redirect_uri,
-            scope=SETTINGS.spotify_scope #TODO: Añadir mas scopes para poder ver albumes, canciones mas escuchadas, informacion de artista, album y canciones
-        ))
-    
+        self.credentials = (SETTINGS.client_id, SETTINGS.client_secret, SETTINGS.redirect_uri)
+        self._auth_managers: dict[str, SpotifyOAuth] = {}
+        self._clients: dict[str, CachedSpotify] = {}
+        self._lock = threading.Lock()
+        self._refresher: threading.Thread | None = None
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def set_credentials(self, client_id: str, client_secret: str, redirect_uri: str):
+        with self._lock:
+            self.credentials = (client_id, client_secret, redirect_uri)
+            self._auth_managers.clear()
+            self._clients.clear()
+
+    def get_auth_manager(self, username: str) -> SpotifyOAuth:
+        with self._lock:
+            auth_manager = self._auth_managers.get(username)
+            if auth_manager is None:
+                client_id, client_secret, redirect_uri = self.credentials
+                os.makedirs(SETTINGS.spotify_token_cache_dir, exist_ok=True)
+                auth_manager = SpotifyOAuth(
+                    client_id=client_id,
+                    client_secret=client_secret,
+                    redirect_uri=redirect_uri,
+                    scope=SETTINGS.spotify_scope, #TODO: Añadir mas scopes para poder ver albumes, canciones mas escuchadas, informacion de artista, album y canciones
+                    cache_handler=CacheFileHandler(
+                        cache_path=os.path.join(SETTINGS.spotify_token_cache_dir, username), username=username
+                    ),
+                    requests_session=get_spotify_session(),
+                )
+                self._auth_managers[username] = auth_manager
+            return auth_manager
+
+    def get_client(self, username: str | None = None) -> CachedSpotify:
+        username = username or SETTINGS.username
+        client = self._clients.get(username)
+        if client is None:
+            auth_manager = self.get_auth_manager(username)
+            with self._lock:
+                client = self._clients.get(username)
+                if client is None:
+                    client = CachedSpotify(RateLimitedSpotify(auth_manager=auth_manager))
+                    self._clients[username] = client
+        self.start_refresher()
+        return client
+
+    def refresh_expiring(self):
+        with self._lock:
+            auth_managers = list(self._auth_managers.items())
+        for username, auth_manager in auth_managers:
+            token_info = auth_manager.cache_handler.get_cached_token()
+            if not token_info or token_info["expires_at"] - time.time() > SETTINGS.spotify_token_refresh_margin:
+                continue
+            try:
+                auth_manager.refresh_access_token(token_info["refresh_token"])
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_errors += 1
+                print(f"Error refreshing the Spotify token of {username}: {e}")
+
+    def start_refresher(self):
+        if self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+
+            def run():
+                while True:
+                    time.sleep(SETTINGS.spotify_token_check_interval)
+                    self.refresh_expiring()
+
+            self._refresher = threading.Thread(target=run, name="spotify-token-refresher", daemon=True)
+            self._refresher.start()
+
+
+token_manager = SpotifyTokenManager()
+
+
+class SpotifyObject:
+    """
+    Spotify client of one user, by default `SETTINGS.username`. Credentials, tokens and clients live in the
+    process-wide `token_manager`, every SpotifyObject sees the same ones.
+    The client is built the first time it is requested, not when the object is created.
+    """
+
+    def __init__(self, username: str | None = None, manager: SpotifyTokenManager = token_manager):
+        self.username = username or SETTINGS.username
+        self.manager = manager
+
     def set_spotify_credentials(self, client_id: str, client_secret: str, redirect_uri: str):
-        self.sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
-            client_id=client_id,
-            client_secret=client_secret,
-            redirect_uri=redirect_uri,
-            scope=SETTINGS.spotify_scope #TODO: Añadir mas scopes para poder ver albumes, canciones mas escuchadas, informacion de artista, album y canciones
-        ))
-    
-    def get_spotify_object(self):
-        return self.sp
\ No newline at end of file
+        self.manager.set_credentials(client_id, client_secret, redirect_uri)
+
+    def get_spotify_object(self) -> CachedSpotify:
+        return self.manager.get_client(self.username)
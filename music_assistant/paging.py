@@ -0,0 +1,56 @@
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from music_assistant.config import get_agent_settings
+
+SETTINGS = get_agent_settings()
+
+# Solo los campos que se mapean a Song, reduce bastante el tamaño de cada pagina
+PLAYLIST_TRACK_FIELDS = "total,items(track(id,name,uri,artists(id,name)))"
+
+
+def iter_pages(
+    fetch_page: Callable[..., dict],
+    page_size: int,
+    max_workers: int = SETTINGS.paging_max_workers,
+    max_items: int | None = None,
+) -> Iterator[dict]:
+    """
+    Streams the `items` of every page of a Spotify paging object, in order.
+
+    `fetch_page(limit=..., offset=...)` is called once for the first page to read `total`, the remaining
+    offsets are then fetched concurrently, keeping at most `max_workers` pages in flight.
+    Pages that were not consumed yet are cancelled when the caller stops iterating.
+    """
+    first_page = fetch_page(limit=page_size, offset=0)
+    total = first_page["total"] if max_items is None else min(first_page["total"], max_items)
+    yielded = 0
+    for item in first_page["items"]:
+        if yielded >= total:
+            return
+        yielded += 1
+        yield item
+
+    offsets = iter(range(page_size, total, page_size))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for offset in offsets:
+            pending.append(executor.submit(fetch_page, limit=page_size, offset=offset))
+            if len(pending) >= max_workers:
+                break
+
+        while pending:
+            page = pending.popleft().result()
+            next_offset = next(offsets, None)
+            if next_offset is not None:
+                pending.append(executor.submit(fetch_page, limit=page_size, offset=next_offset))
+            for item in page["items"]:
+                if yielded >= total:
+                    return
+                yielded += 1
+                yield item
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
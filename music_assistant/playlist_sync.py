@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from music_assistant.config import get_agent_settings
+from music_assistant.paging import iter_pages
+
+SETTINGS = get_agent_settings()
+
+# Maximo de items por llamada que acepta la API de Spotify al agregar o quitar canciones
+CHUNK_SIZE = 100
+
+# playlist id -> (snapshot_id, uris), evita volver a leer una playlist que no cambio
+_playlist_contents: dict[str, tuple[str, list[str]]] = {}
+_playlist_contents_lock = threading.Lock()
+
+
+def _chunks(items: list[str], size: int = CHUNK_SIZE) -> list[list[str]]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def find_user_playlist(sp, user_id: str, playlist_name: str) -> dict | None:
+    """
+    Returns the first playlist owned by `user_id` called `playlist_name`, stops paging as soon as it is found.
+    """
+    for playlist in iter_pages(sp.current_user_playlists, page_size=50):
+        if playlist['name'] == playlist_name and playlist['owner']['id'] == user_id:
+            return playlist
+    return None
+
+
+def read_playlist_uris(sp, playlist_id: str) -> tuple[str, list[str]]:
+    """
+    Returns (snapshot_id, track uris) of a playlist. The track list is only read again if the snapshot changed.
+    """
+    snapshot_id = sp.playlist(playlist_id, fields="snapshot_id")['snapshot_id']
+    with _playlist_contents_lock:
+        cached = _playlist_contents.get(playlist_id)
+    if cached is not None and cached[0] == snapshot_id:
+        return cached
+
+    items = iter_pages(
+        lambda limit, offset: sp.playlist_items(playlist_id, fields="total,items(track(uri))", limit=limit, offset=offset),
+        page_size=100,
+    )
+    uris = [item['track']['uri'] for item in items if item.get('track')]
+    _remember_contents(playlist_id, snapshot_id, uris)
+    return snapshot_id, uris
+
+
+def _remember_contents(playlist_id: str, snapshot_id: str, uris: list[str]):
+    with _playlist_contents_lock:
+        _playlist_contents[playlist_id] = (snapshot_id, uris)
+
+
+def sync_playlist(sp, playlist_name: str, track_uris: list[str], playlist_description: str = "") -> tuple[dict, list[str]]:
+    """
+    Makes the user's playlist called `playlist_name` contain exactly `track_uris`, creating it if needed.
+
+    Only the difference with the current contents is sent: removals go out concurrently in chunks of 100,
+    additions go out in order in chunks of 100. Tracks already in the playlist keep their position.
+    Running it twice with the same arguments does not create a second playlist nor send any change.
+    Returns the playlist and its resulting uris.
+    """
+    user_id = sp.current_user()['id']
+    target_uris = list(dict.fromkeys(track_uris))
+
+    playlist = find_user_playlist(sp, user_id, playlist_name)
+    if playlist is None:
+        playlist = sp.user_playlist_create(user=user_id, name=playlist_name, public=False, description=playlist_description)
+        snapshot_id, current_uris = playlist['snapshot_id'], []
+    else:
+        snapshot_id, current_uris = read_playlist_uris(sp, playlist['id'])
+
+    target_set = set(target_uris)
+    current_set = set(current_uris)
+    to_remove = [uri for uri in dict.fromkeys(current_uris) if uri not in target_set]
+    to_add = [uri for uri in target_uris if uri not in current_set]
+
+    if to_remove:
+        with ThreadPoolExecutor(max_workers=SETTINGS.paging_max_workers) as executor:
+            list(executor.map(
+                lambda chunk: sp.playlist_remove_all_occurrences_of_items(playlist['id'], chunk),
+                _chunks(to_remove),
+            ))
+
+    for chunk in _chunks(to_add):
+        snapshot_id = sp.playlist_add_items(playlist_id=playlist['id'], items=chunk)['snapshot_id']
+
+    if to_remove and not to_add:
+        snapshot_id = sp.playlist(playlist['id'], fields="snapshot_id")['snapshot_id']
+
+    resulting_uris = [uri for uri in current_uris if uri in target_set] + to_add
+    _remember_contents(playlist['id'], snapshot_id, resulting_uris)
+    return playlist, resulting_uris
@@ -3,21 +3,47 @@ from llama_index.core import (
     VectorStoreIndex,
     StorageContext,
     load_index_from_storage,
-    SimpleDirectoryReader,
     PromptTemplate,
     Settings,
 )
-from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.vector_stores import SimpleVectorStore
 from llama_index.llms.openai import OpenAI
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from music_assistant.config import get_agent_settings
+from music_assistant.embeddings import CachedEmbedding
+from music_assistant.ann import IVFVectorStore
+from music_assistant.snapshot import MmapVectorStore, convert_persist_dir, SNAPSHOT_DIRNAME
+from music_assistant.ingestion import incremental_ingest, seed_store
+from music_assistant.semantic_cache import SemanticCache, SemanticCacheQueryEngine
+from music_assistant.cache import locked_cache
 
 SETTINGS = get_agent_settings()
 
-llm = OpenAI(model="gpt-4o-mini", api_key=SETTINGS.openai_api_key)
-embed_model = HuggingFaceEmbedding(model_name=SETTINGS.hf_embeddings_model)
-Settings.embed_model = embed_model
-Settings.llm = llm
+
+@locked_cache
+def get_llm() -> OpenAI:
+    llm = OpenAI(model="gpt-4o-mini", api_key=SETTINGS.openai_api_key)
+    Settings.llm = llm
+    return llm
+
+
+@locked_cache
+def get_embed_model() -> CachedEmbedding:
+    # Importar huggingface carga torch/transformers, solo se hace cuando se necesita el modelo
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    if SETTINGS.embed_num_threads is not None:
+        import torch
+
+        torch.set_num_threads(SETTINGS.embed_num_threads)
+
+    embed_model = CachedEmbedding(
+        HuggingFaceEmbedding(model_name=SETTINGS.hf_embeddings_model, embed_batch_size=SETTINGS.embed_batch_size),
+        max_entries=SETTINGS.embed_cache_size,
+        path=SETTINGS.cache_path if SETTINGS.embed_cache_persist else None,
+    )
+    Settings.embed_model = embed_model
+    return embed_model
 
 
 class MusicRAG:
@@ -26,30 +52,81 @@ class MusicRAG:
         store_path: str,
         data_dir: str | None = None,
         qa_prompt_tpl: PromptTemplate | None = None,
+        seed_path: str | None = None,
     ):
         self.store_path = store_path
+        get_llm()
+        get_embed_model()
 
-        if not os.path.exists(store_path) and data_dir is not None:
-            self.index = self.ingest_data(store_path, data_dir)
-        else:
-            self.index = load_index_from_storage(
-                StorageContext.from_defaults(persist_dir=store_path)
-            )
+        if not os.path.exists(store_path) and seed_path is not None and os.path.isdir(seed_path):
+            seed_store(store_path, seed_path)
+
+        if data_dir is not None and os.path.isdir(data_dir):
+            self.ingest_data(store_path, data_dir)
 
+        self.index = self.load_index()
         self.qa_prompt_tpl = qa_prompt_tpl
 
-    def ingest_data(self, store_path: str, data_dir: str) -> VectorStoreIndex:
-        documents = SimpleDirectoryReader(data_dir).load_data()
-        index = VectorStoreIndex.from_documents(documents, show_progress=True)
-        index.storage_context.persist(persist_dir=store_path)
-        return index
+    def load_index(self) -> VectorStoreIndex:
+        if SETTINGS.vector_backend == "mmap":
+            return self.load_snapshot(self.store_path)
+        vector_store = self.load_vector_store(self.store_path)
+        return load_index_from_storage(StorageContext.from_defaults(persist_dir=self.store_path, vector_store=vector_store))
 
-    def get_query_engine(self) -> RetrieverQueryEngine:
-        query_engine = self.index.as_query_engine()
+    def load_vector_store(self, store_path: str | None = None) -> SimpleVectorStore:
+        if store_path is None:
+            vector_store = SimpleVectorStore()
+        else:
+            vector_store = SimpleVectorStore.from_persist_dir(store_path)
+        if SETTINGS.vector_backend == "ivf":
+            vector_store = IVFVectorStore.from_simple_vector_store(vector_store)
+        return vector_store
+
+    def load_snapshot(self, store_path: str) -> VectorStoreIndex:
+        snapshot_dir = os.path.join(store_path, SNAPSHOT_DIRNAME)
+        if not os.path.exists(snapshot_dir):
+            convert_persist_dir(store_path, snapshot_dir)
+        return VectorStoreIndex.from_vector_store(MmapVectorStore(snapshot_dir), embed_model=get_embed_model())
+
+    def ingest_data(self, store_path: str, data_dir: str) -> bool:
+        """
+        Updates the store with the new, changed and deleted files of `data_dir`, see `incremental_ingest`.
+        """
+        return incremental_ingest(store_path, data_dir)
 
+    def index_version(self) -> str:
+        # Cada ingesta apunta el store a un directorio nuevo
+        return os.path.realpath(self.store_path)
+
+    def _build_query_engine(self) -> BaseQueryEngine:
+        query_engine = self.index.as_query_engine(similarity_top_k=SETTINGS.rag_top_k)
         if self.qa_prompt_tpl is not None:
             query_engine.update_prompts(
                 {"response_synthesizer:text_qa_template": self.qa_prompt_tpl}
             )
+        return query_engine
+
+    def reload_query_engine(self) -> BaseQueryEngine:
+        """
+        Loads the index the store points to now and returns a query engine over it.
+        """
+        self.index = self.load_index()
+        return self._build_query_engine()
+
+    def get_query_engine(self) -> BaseQueryEngine:
+        query_engine = self._build_query_engine()
+
+        if SETTINGS.semantic_cache_enabled:
+            query_engine = SemanticCacheQueryEngine(
+                query_engine,
+                embed_model=get_embed_model(),
+                cache=SemanticCache(
+                    threshold=SETTINGS.semantic_cache_threshold,
+                    ttl=SETTINGS.semantic_cache_ttl,
+                    max_entries=SETTINGS.semantic_cache_size,
+                ),
+                index_version=self.index_version,
+                reload_query_engine=self.reload_query_engine,
+            )
 
         return query_engine
@@ -0,0 +1,276 @@
+import time
+import threading
+from collections.abc import Iterator
+import numpy as np
+from scipy import sparse
+from music_assistant.models import UserInformation
+from music_assistant.objects import spotify_cache
+from music_assistant.store import add_snapshot_listener, get_store_version, read_catalog, read_snapshots
+from music_assistant.digest import score_ranked_items
+from music_assistant.config import get_agent_settings
+from music_assistant.cache import locked_cache
+
+SETTINGS = get_agent_settings()
+
+
+def artist_key(name: str) -> str:
+    # Las canciones del store solo guardan el nombre del artista, los artistas se identifican por nombre
+    return " ".join(name.casefold().split())
+
+
+def iter_spotify_objects(value, object_type: str) -> Iterator[dict]:
+    """
+    Every Spotify API object of `object_type` ("track", "artist", ...) nested anywhere in a response.
+    """
+    if isinstance(value, dict):
+        if value.get("type") == object_type and value.get("id"):
+            yield value
+        for child in value.values():
+            yield from iter_spotify_objects(child, object_type)
+    elif isinstance(value, list):
+        for child in value:
+            yield from iter_spotify_objects(child, object_type)
+
+
+class RecommenderIndex:
+    """
+    Content-based recommender over every track we know: the tracks of the stored snapshots of all users
+    and the tracks and artists of cached Spotify responses.
+
+    A track is described by its artist and that artist's genres: its row of the track-feature matrix
+    holds the artist identity and the artist's genres, L2-normalized. A user's profile is a vector over the
+    same features built from the artists and genres of their snapshots, and candidates are ranked by
+    cosine similarity with it.
+
+    Artists and genres get their feature column when they first appear, so columns never move. As
+    snapshots are saved, the next query updates the normalized matrix instead of rebuilding it: new
+    columns are padded, the rows of new tracks are appended and only the rows of the tracks whose
+    artist gained genres are recomputed.
+    """
+
+    def __init__(self, genre_weight: float = 0.5, max_per_artist: int = 3):
+        self.genre_weight = genre_weight
+        self.max_per_artist = max_per_artist
+        self.artist_columns: dict[str, int] = {}  # artist_key -> indice del artista
+        self.artist_names: list[str] = []
+        self.artist_features: list[int] = []  # indice del artista -> columna de la matriz
+        self.artist_tracks: list[list[int]] = []  # indice del artista -> filas de sus canciones
+        self.artist_ids: dict[str, str] = {}  # id de Spotify -> nombre, para semillas por id
+        self.artist_genres: list[set[str]] = []
+        self.genre_columns: dict[str, int] = {}  # genero -> columna de la matriz
+        self.track_rows: dict[str, int] = {}
+        self.track_ids: list[str] = []
+        self.track_artists: list[int] = []
+        self._feature_count = 0
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._changed_artists: set[int] = set()
+        self._dirty = True
+        self._lock = threading.RLock()
+        self._cache_scanned_at = 0.0
+        # username -> (version del store, perfil, canciones que ya conoce)
+        self._profiles: dict[str, tuple[tuple, np.ndarray, set[str]]] = {}
+
+    def _artist(self, name: str) -> int:
+        key = artist_key(name)
+        column = self.artist_columns.get(key)
+        if column is None:
+            column = len(self.artist_names)
+            self.artist_columns[key] = column
+            self.artist_names.append(name)
+            self.artist_genres.append(set())
+            self.artist_features.append(self._new_feature())
+            self.artist_tracks.append([])
+            self._dirty = True
+        return column
+
+    def _new_feature(self) -> int:
+        self._feature_count += 1
+        return self._feature_count - 1
+
+    def add_artist(self, name: str, genres: list[str] | None, artist_id: str | None = None):
+        with self._lock:
+            column = self._artist(name)
+            if artist_id:
+                self.artist_ids[artist_id] = name
+            new_genres = set(genres or []) - self.artist_genres[column]
+            if new_genres:
+                self.artist_genres[column].update(new_genres)
+                for genre in new_genres:
+                    if genre not in self.genre_columns:
+                        self.genre_columns[genre] = self._new_feature()
+                self._changed_artists.add(column)
+                self._dirty = True
+
+    def add_track(self, track_id: str, artist_name: str):
+        with self._lock:
+            if track_id in self.track_rows:
+                return
+            artist = self._artist(artist_name)
+            self.track_rows[track_id] = len(self.track_ids)
+            self.artist_tracks[artist].append(len(self.track_ids))
+            self.track_ids.append(track_id)
+            self.track_artists.append(artist)
+            self._dirty = True
+
+    def add_snapshot(self, information: UserInformation):
+        with self._lock:
+            for artist in information.top_artists.top_artists:
+                self.add_artist(artist.name, artist.genres, artist.id)
+            for song in information.top_tracks.top_tracks:
+                self.add_track(song.id, song.artist)
+
+    def add_cached_metadata(self):
+        """
+        Adds the tracks and artists of every cached Spotify response (searches, albums, artists, ...).
+        """
+        with self._lock:
+            for _, response in spotify_cache.scan():
+                for artist in iter_spotify_objects(response, "artist"):
+                    if "genres" in artist:
+                        self.add_artist(artist["name"], artist["genres"], artist["id"])
+                for track in iter_spotify_objects(response, "track"):
+                    if track.get("artists"):
+                        self.add_track(track["id"], track["artists"][0]["name"])
+            self._cache_scanned_at = time.time()
+
+    def seed_artist_names(self, artist_ids: list[str] | None = None, track_ids: list[str] | None = None) -> list[str]:
+        """
+        Names of the known artists among `artist_ids` and of the artists of the known tracks among `track_ids`,
+        to use Spotify API seeds with `recommend`.
+        """
+        with self._lock:
+            names = [self.artist_ids[artist_id] for artist_id in artist_ids or [] if artist_id in self.artist_ids]
+            names.extend(
+                self.artist_names[self.track_artists[self.track_rows[track_id]]]
+                for track_id in track_ids or [] if track_id in self.track_rows
+            )
+            return names
+
+    def _track_rows_matrix(self, rows: list[int]) -> sparse.csr_matrix:
+        """
+        Normalized feature rows of the tracks at `rows`: the artist column is 1, each of the artist's
+        n genres weighs `genre_weight / sqrt(n)`.
+        """
+        indptr, columns, values = [0], [], []
+        for row in rows:
+            artist = self.track_artists[row]
+            genres = self.artist_genres[artist]
+            norm = np.sqrt(1 + self.genre_weight ** 2) if genres else 1.0
+            columns.append(self.artist_features[artist])
+            values.append(1 / norm)
+            for genre in genres:
+                columns.append(self.genre_columns[genre])
+                values.append(self.genre_weight / np.sqrt(len(genres)) / norm)
+            indptr.append(len(columns))
+        return sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), columns, indptr), shape=(len(rows), self._feature_count)
+        )
+
+    def _update(self):
+        matrix = self._matrix
+        built_tracks = matrix.shape[0]
+        if matrix.shape[1] < self._feature_count:
+            # Columnas nuevas (artistas o generos): se agregan vacias, las filas existentes no cambian
+            matrix.resize((built_tracks, self._feature_count))
+
+        changed_rows = sorted(
+            row for artist in self._changed_artists for row in self.artist_tracks[artist] if row < built_tracks
+        )
+        if changed_rows:
+            keep = np.ones(built_tracks, dtype=np.float32)
+            keep[changed_rows] = 0
+            placement = sparse.csr_matrix(
+                (np.ones(len(changed_rows), dtype=np.float32), (changed_rows, np.arange(len(changed_rows)))),
+                shape=(built_tracks, len(changed_rows)),
+            )
+            matrix = (sparse.diags(keep) @ matrix + placement @ self._track_rows_matrix(changed_rows)).tocsr()
+
+        if built_tracks < len(self.track_ids):
+            new_rows = self._track_rows_matrix(list(range(built_tracks, len(self.track_ids))))
+            matrix = sparse.vstack([matrix, new_rows]).tocsr()
+
+        self._matrix = matrix
+        self._changed_artists.clear()
+        self._dirty = False
+
+    def _profile(self, username: str) -> tuple[np.ndarray, set[str]]:
+        version = get_store_version(username)
+        cached = self._profiles.get(username)
+        if cached is not None and cached[0] == version and len(cached[1]) == self._feature_count:
+            return cached[1], cached[2]
+
+        snapshots = read_snapshots(username, limit=SETTINGS.digest_snapshots_limit)
+        for information in snapshots:
+            self.add_snapshot(information)
+        profile = np.zeros(self._feature_count, dtype=np.float32)
+        artist_scores = score_ranked_items([[artist.name for artist in snapshot.top_artists.top_artists] for snapshot in snapshots])
+        for name, score in artist_scores.items():
+            profile[self.artist_features[self.artist_columns[artist_key(name)]]] += score
+        genre_scores = score_ranked_items([snapshot.top_genres.top_genres for snapshot in snapshots])
+        for genre, score in genre_scores.items():
+            if genre in self.genre_columns:
+                profile[self.genre_columns[genre]] += self.genre_weight * score
+        known_tracks = {song.id for snapshot in snapshots for song in snapshot.top_tracks.top_tracks}
+        self._profiles[username] = (version, profile, known_tracks)
+        return profile, known_tracks
+
+    def recommend(
+        self,
+        username: str,
+        limit: int = 30,
+        seed_artists: list[str] | None = None,
+        seed_genres: list[str] | None = None,
+        exclude_known: bool = True,
+    ) -> list[str]:
+        """
+        Returns the URIs of the `limit` tracks closest to the user's profile, at most `max_per_artist` per artist.
+        `seed_artists` (names) and `seed_genres` pull the profile towards them. Tracks already in the user's
+        snapshots are skipped unless `exclude_known` is False.
+        """
+        with self._lock:
+            if time.time() - self._cache_scanned_at > SETTINGS.recommender_cache_rescan:
+                self.add_cached_metadata()
+            profile, known_tracks = self._profile(username)
+            profile = profile.copy()
+            for name in seed_artists or []:
+                column = self.artist_columns.get(artist_key(name))
+                if column is not None:
+                    profile[self.artist_features[column]] += profile.max(initial=0) or 1.0
+            for genre in seed_genres or []:
+                column = self.genre_columns.get(genre)
+                if column is not None:
+                    profile[column] += self.genre_weight * (profile.max(initial=0) or 1.0)
+            if self._dirty:
+                self._update()
+            if not self.track_ids or not profile.any():
+                return []
+
+            scores = self._matrix @ (profile / np.linalg.norm(profile))
+            if exclude_known:
+                scores[[self.track_rows[track_id] for track_id in known_tracks if track_id in self.track_rows]] = -1.0
+
+            uris = []
+            per_artist: dict[int, int] = {}
+            for row in np.argsort(-scores):
+                if scores[row] <= 0 or len(uris) >= limit:
+                    break
+                artist_column = self.track_artists[row]
+                if per_artist.get(artist_column, 0) >= self.max_per_artist:
+                    continue
+                per_artist[artist_column] = per_artist.get(artist_column, 0) + 1
+                uris.append(f"spotify:track:{self.track_ids[row]}")
+            return uris
+
+
+@locked_cache
+def get_recommender() -> RecommenderIndex:
+    recommender = RecommenderIndex(SETTINGS.recommender_genre_weight, SETTINGS.recommender_max_per_artist)
+    songs, artists = read_catalog()
+    for artist in artists:
+        recommender.add_artist(artist.name, artist.genres, artist.id)
+    for song in songs:
+        recommender.add_track(song.id, song.artist)
+    recommender.add_cached_metadata()
+    # Cada snapshot nuevo entra al indice sin reconstruirlo desde el store
+    add_snapshot_listener(recommender.add_snapshot)
+    return recommender
@@ -0,0 +1,121 @@
+import threading
+from time import perf_counter
+from contextlib import contextmanager
+from collections.abc import Callable
+from typing import Any
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.tools import BaseTool, FunctionTool, QueryEngineTool, ToolMetadata, ToolOutput
+from music_assistant.config import get_agent_settings
+from music_assistant.encoding import encode_tool_output
+
+SETTINGS = get_agent_settings()
+
+
+class LazyQueryEngineTool(QueryEngineTool):
+    """
+    QueryEngineTool that only builds its query engine (index, embedding model, ...) the first time it is queried.
+    `query_engine_factory` should cache its result.
+    """
+
+    def __init__(
+        self,
+        query_engine_factory: Callable[[], BaseQueryEngine],
+        metadata: ToolMetadata,
+        resolve_input_errors: bool = True,
+    ):
+        self._query_engine_factory = query_engine_factory
+        self._metadata = metadata
+        self._resolve_input_errors = resolve_input_errors
+
+    @property
+    def _query_engine(self) -> BaseQueryEngine:
+        return self._query_engine_factory()
+
+
+class CompactFunctionTool(FunctionTool):
+    """
+    FunctionTool whose observation is the compact encoding of the result (see `encode_tool_output`)
+    instead of its repr, cut at the tool token budget without dropping any ID. `raw_output` keeps the original objects.
+    """
+
+    @property
+    def token_budget(self) -> int:
+        return SETTINGS.tool_output_token_budgets.get(self.metadata.name, SETTINGS.tool_output_token_budget)
+
+    def _output(self, tool_output: Any, args: tuple, kwargs: dict) -> ToolOutput:
+        return ToolOutput(
+            content=encode_tool_output(tool_output, self.token_budget),
+            tool_name=self.metadata.name,
+            raw_input={"args": args, "kwargs": kwargs},
+            raw_output=tool_output,
+        )
+
+    def call(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        return self._output(self._fn(*args, **kwargs), args, kwargs)
+
+    async def acall(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        return self._output(await self._async_fn(*args, **kwargs), args, kwargs)
+
+
+class ToolRegistry:
+    """
+    Holds the agent tools, cheap to build, and the warm-up functions of the heavy resources they use.
+    Resources are created on first use, or ahead of time in a background thread with `warm_up`.
+    Every startup phase is timed in `timings`.
+    """
+
+    def __init__(self):
+        self._tools: dict[str, BaseTool] = {}
+        self._warmups: dict[str, Callable[[], object]] = {}
+        self.timings: dict[str, float] = {}
+        self._timings_lock = threading.Lock()
+
+    def register(self, tool: BaseTool):
+        self._tools[tool.metadata.name] = tool
+
+    def register_warmup(self, resource_name: str, warmup: Callable[[], object]):
+        self._warmups[resource_name] = warmup
+
+    def get_tool(self, name: str) -> BaseTool:
+        return self._tools[name]
+
+    def get_tools(self, names: list[str] | None = None) -> list[BaseTool]:
+        if names is None:
+            return list(self._tools.values())
+        return [self._tools[name] for name in names]
+
+    def record(self, phase_name: str, seconds: float):
+        with self._timings_lock:
+            self.timings[phase_name] = seconds
+
+    @contextmanager
+    def phase(self, phase_name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase_name, perf_counter() - start)
+
+    def warm_up(self, background: bool = True) -> threading.Thread | None:
+        def run():
+            for resource_name, warmup in self._warmups.items():
+                with self.phase(f"warmup:{resource_name}"):
+                    try:
+                        warmup()
+                    except Exception as e:
+                        print(f"Error warming up {resource_name}: {e}")
+            print(self.timing_report())
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="tool-registry-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def timing_report(self) -> str:
+        with self._timings_lock:
+            timings = dict(self.timings)
+        lines = ["Startup timings:"]
+        lines.extend(f"  - {phase_name}: {seconds:.2f}s" for phase_name, seconds in timings.items())
+        return "\n".join(lines)
@@ -0,0 +1,184 @@
+import re
+import threading
+import unicodedata
+from time import perf_counter
+from collections.abc import Callable
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from music_assistant.ann import normalize_rows
+from music_assistant.models import Playlist, PlaylistWithTracks
+from music_assistant.tools import show_all_Spotify_playlists, show_specific_Spotify_playlist_tracks
+
+# Frases de ejemplo por intencion, el mensaje se compara con todas por similitud de embeddings
+INTENT_EXEMPLARS = {
+    "show_all_playlists": [
+        "muéstrame mis playlists",
+        "cuáles son mis playlists",
+        "qué playlists tengo",
+        "lista mis playlists de Spotify",
+        "enséñame todas mis listas de reproducción",
+        "show me my playlists",
+        "list all my Spotify playlists",
+    ],
+    "show_playlist_tracks": [
+        "qué hay en la playlist Verano",
+        "qué canciones tiene mi playlist Favoritas",
+        "muéstrame las canciones de la playlist Fiesta",
+        "enséñame la lista de reproducción Gym",
+        "qué suena en mi playlist Chill",
+        "show me the songs in my playlist Road Trip",
+        "what's in the playlist Workout",
+    ],
+    # Intenciones sin handler: mensajes parecidos a los de arriba que piden otra accion y van al agente
+    "add_to_playlist": [
+        "agrega canciones a mi playlist Verano",
+        "añade esta canción a la playlist Favoritas",
+        "pon más canciones en mi playlist Fiesta",
+        "mete temas de Bad Bunny en mi lista de reproducción Gym",
+        "add songs to my playlist Workout",
+    ],
+    "create_playlist": [
+        "crea una playlist llamada Verano",
+        "hazme una playlist de rock",
+        "créame una lista de reproducción para el gym",
+        "genera una playlist con canciones de Shakira",
+        "qué playlist podría hacer",
+        "create a playlist called Road Trip",
+        "which playlist should I create",
+    ],
+    "delete_playlist": [
+        "borra la playlist Gym",
+        "elimina mi playlist Favoritas",
+        "quita canciones de la playlist Fiesta",
+        "vacía la lista de reproducción Chill",
+        "delete my playlist Workout",
+    ],
+    "recommend": [
+        "recomiéndame canciones parecidas a mi playlist Verano",
+        "qué me recomiendas escuchar",
+        "sugiéreme artistas como los de mi playlist Chill",
+        "qué canciones nuevas me podrían gustar",
+        "recommend me songs like my playlist Road Trip",
+    ],
+}
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def render_playlists(playlists: list[Playlist]) -> str:
+    if not playlists:
+        return "No tienes playlists en Spotify."
+    lines = [f"Tienes {len(playlists)} playlists en Spotify:", ""]
+    lines.extend(f"- **{playlist.name}** ({playlist.num_tracks} canciones)" for playlist in playlists)
+    return "\n".join(lines)
+
+
+def render_playlist_tracks(playlist: Playlist, playlist_with_tracks: PlaylistWithTracks) -> str:
+    if not playlist_with_tracks.tracks:
+        return f"La playlist **{playlist.name}** no tiene canciones."
+    lines = [f"La playlist **{playlist.name}** tiene {playlist_with_tracks.total} canciones:", ""]
+    lines.extend(
+        f"{position}. {song.name} - {song.artist}"
+        for position, song in enumerate(playlist_with_tracks.tracks, start=1)
+    )
+    return "\n".join(lines)
+
+
+class IntentRouter:
+    """
+    Answers the simplest requests without the agent: the message is compared with the exemplars of each
+    intent and, if the best one is at least `threshold` similar and `margin` ahead of the other intents,
+    the tool runs directly and its result is rendered with a template. Anything else returns None and
+    goes to the agent, also when a playlist named in the message can't be found.
+
+    Intents without a handler (adding to, creating or deleting a playlist, recommendations) are never
+    routed, they are there so a request for an action has to clear the margin against them.
+    """
+
+    def __init__(
+        self,
+        embed_model_factory: Callable[[], BaseEmbedding],
+        threshold: float = 0.9,
+        margin: float = 0.03,
+        exemplars: dict[str, list[str]] = INTENT_EXEMPLARS,
+    ):
+        self.embed_model_factory = embed_model_factory
+        self.threshold = threshold
+        self.margin = margin
+        self.intents = list(exemplars)
+        self._exemplars = exemplars
+        self._exemplar_intents = np.asarray([index for index, intent in enumerate(exemplars) for _ in exemplars[intent]])
+        self._matrix: np.ndarray | None = None
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.fallthrough = 0
+        self.routed_seconds = 0.0
+        self._handlers = {
+            "show_all_playlists": self._show_all_playlists,
+            "show_playlist_tracks": self._show_playlist_tracks,
+        }
+
+    def _get_matrix(self) -> np.ndarray:
+        with self._lock:
+            if self._matrix is None:
+                texts = [text for intent in self.intents for text in self._exemplars[intent]]
+                self._matrix = normalize_rows(
+                    np.asarray(self.embed_model_factory().get_text_embedding_batch(texts), dtype=np.float32)
+                )
+            return self._matrix
+
+    def classify(self, message: str) -> tuple[str | None, float]:
+        query_vector = np.asarray(self.embed_model_factory().get_query_embedding(message), dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        scores = self._get_matrix() @ query_vector
+        intent_scores = np.asarray([scores[self._exemplar_intents == index].max() for index in range(len(self.intents))])
+        order = np.argsort(-intent_scores)
+        best = float(intent_scores[order[0]])
+        runner_up = float(intent_scores[order[1]]) if len(order) > 1 else -1.0
+        if best >= self.threshold and best - runner_up >= self.margin:
+            return self.intents[order[0]], best
+        return None, best
+
+    def route(self, message: str) -> str | None:
+        start = perf_counter()
+        intent, _ = self.classify(message)
+        response = None
+        if intent in self._handlers:
+            try:
+                response = self._handlers[intent](message)
+            except Exception as e:
+                print(f"Error routing {intent}, falling back to the agent: {e}")
+        if response is None:
+            self.fallthrough += 1
+            return None
+        self.routed += 1
+        self.routed_seconds += perf_counter() - start
+        return response
+
+    def _show_all_playlists(self, message: str) -> str:
+        return render_playlists(show_all_Spotify_playlists())
+
+    def _show_playlist_tracks(self, message: str) -> str | None:
+        # La playlist con el nombre mas largo que aparece en el mensaje, "Rock" no gana a "Rock en español"
+        normalized_message = f" {normalize_text(message)} "
+        matches = [
+            playlist for playlist in show_all_Spotify_playlists()
+            if normalize_text(playlist.name) and f" {normalize_text(playlist.name)} " in normalized_message
+        ]
+        if not matches:
+            return None
+        playlist = max(matches, key=lambda playlist: len(playlist.name))
+        return render_playlist_tracks(playlist, show_specific_Spotify_playlist_tracks(playlist.id))
+
+    def stats(self) -> dict:
+        total = self.routed + self.fallthrough
+        return {
+            "routed": self.routed,
+            "fallthrough": self.fallthrough,
+            "routed_rate": self.routed / total if total else 0.0,
+            "routed_avg_seconds": self.routed_seconds / self.routed if self.routed else None,
+        }
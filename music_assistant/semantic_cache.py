@@ -0,0 +1,156 @@
+import time
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+import numpy as np
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.response.schema import Response, RESPONSE_TYPE
+from llama_index.core.schema import QueryBundle
+
+
+class SemanticCache:
+    """
+    Response cache keyed by query embedding: a query is a hit if the cosine similarity with a cached
+    query is at least `threshold`. Entries expire after `ttl` seconds and the least recently used one is
+    evicted past `max_entries`. All entries belong to one index version, a new version empties the cache.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 24 * 60 * 60, max_entries: int = 512):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version: str | None = None
+        # key -> (expires_at, embedding normalizado, respuesta)
+        self._entries: OrderedDict[int, tuple[float, np.ndarray, str]] = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Mejor similitud de cada miss, en intervalos de 0.05: muestra cuantos hits daria bajar el umbral
+        self._miss_similarities = np.zeros(20, dtype=np.int64)
+
+    def check_version(self, version: str) -> bool:
+        """
+        Empties the cache if `version` is not the cached one. Returns whether the version changed.
+        """
+        with self._lock:
+            if version == self.version:
+                return False
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+            return True
+
+    def get(self, embedding: list[float]) -> tuple[str | None, float]:
+        query_vector = np.asarray(embedding, dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        now = time.time()
+        with self._lock:
+            for key in [key for key, (expires_at, _, _) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+            best_key, best_similarity = None, 0.0
+            if self._entries:
+                keys = list(self._entries)
+                similarities = np.stack([self._entries[key][1] for key in keys]) @ query_vector
+                best = int(np.argmax(similarities))
+                best_key, best_similarity = keys[best], float(similarities[best])
+
+            if best_key is not None and best_similarity >= self.threshold:
+                self._entries.move_to_end(best_key)
+                self.hits += 1
+                return self._entries[best_key][2], best_similarity
+
+            self.misses += 1
+            self._miss_similarities[min(max(int(best_similarity * 20), 0), 19)] += 1
+            return None, best_similarity
+
+    def set(self, embedding: list[float], response: str):
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        with self._lock:
+            self._entries[self._next_key] = (time.time() + self.ttl, vector, response)
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "threshold": self.threshold,
+            "miss_similarity_histogram": {
+                f"{index / 20:.2f}": int(count) for index, count in enumerate(self._miss_similarities) if count
+            },
+        }
+
+
+class SemanticCacheQueryEngine(BaseQueryEngine):
+    """
+    Answers from `cache` when a similar query was already answered by `query_engine` for the current
+    `index_version()`, otherwise queries it and caches the response text. When the version changes the
+    cache is emptied and, with `reload_query_engine`, the wrapped engine is replaced by one over the new index.
+    """
+
+    def __init__(
+        self,
+        query_engine: BaseQueryEngine,
+        embed_model: BaseEmbedding,
+        cache: SemanticCache,
+        index_version: Callable[[], str],
+        reload_query_engine: Callable[[], BaseQueryEngine] | None = None,
+    ):
+        self._query_engine = query_engine
+        self._embed_model = embed_model
+        self._cache = cache
+        self._index_version = index_version
+        self._reload_query_engine = reload_query_engine
+        self._reload_lock = threading.Lock()
+        # El motor recibido ya consulta la version actual
+        self._cache.check_version(index_version())
+        super().__init__(callback_manager=query_engine.callback_manager)
+
+    def _get_prompt_modules(self) -> dict:
+        return {"query_engine": self._query_engine}
+
+    def cache_stats(self) -> dict:
+        return self._cache.stats()
+
+    def _lookup(self, query_bundle: QueryBundle) -> Response | None:
+        # El retriever reutiliza query_bundle.embedding, la consulta no se embebe dos veces
+        with self._reload_lock:
+            if self._cache.check_version(self._index_version()) and self._reload_query_engine is not None:
+                self._query_engine = self._reload_query_engine()
+        response, similarity = self._cache.get(query_bundle.embedding)
+        if response is None:
+            return None
+        return Response(response=response, metadata={"semantic_cache": {"similarity": similarity}})
+
+    def _query(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self._embed_model.get_query_embedding(query_bundle.query_str)
+        cached_response = self._lookup(query_bundle)
+        if cached_response is not None:
+            return cached_response
+        response = self._query_engine.query(query_bundle)
+        self._cache.set(query_bundle.embedding, str(response))
+        return response
+
+    async def _aquery(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = await self._embed_model.aget_query_embedding(query_bundle.query_str)
+        cached_response = self._lookup(query_bundle)
+        if cached_response is not None:
+            return cached_response
+        response = await self._query_engine.aquery(query_bundle)
+        self._cache.set(query_bundle.embedding, str(response))
+        return response
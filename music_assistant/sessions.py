@@ -0,0 +1,67 @@
+import time
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from llama_index.core.agent import ReActAgent
+
+
+class AgentSessionPool:
+    """
+    One agent per chat session, so conversations don't share memory. Agents are cheap: tools, LLM and
+    embedding model are shared, each agent only owns its (token-capped) chat memory.
+    Sessions idle for more than `idle_ttl` seconds are dropped, and past `max_sessions` the least
+    recently used one is evicted.
+    """
+
+    def __init__(self, agent_factory: Callable[[], ReActAgent], max_sessions: int = 100, idle_ttl: float = 30 * 60):
+        self.agent_factory = agent_factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        # session_id -> (last_used, agent)
+        self._sessions: OrderedDict[str, tuple[float, ReActAgent]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get_agent(self, session_id: str) -> ReActAgent:
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                agent = entry[1]
+                self._sessions.move_to_end(session_id)
+            else:
+                while len(self._sessions) >= self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+                agent = self.agent_factory()
+                self.created += 1
+            self._sessions[session_id] = (now, agent)
+            return agent
+
+    def close(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_idle(time.time())
+
+    def _evict_idle(self, now: float):
+        # Las sesiones estan ordenadas por ultimo uso, las inactivas quedan al principio
+        while self._sessions:
+            session_id, (last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used <= self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
+
+    def stats(self) -> dict:
+        return {
+            "live_sessions": len(self._sessions),
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import threading
+from typing import Any
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.storage.docstore.utils import doc_to_json, json_to_doc
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.simple import _build_metadata_filter_fn
+from llama_index.core.vector_stores.types import BasePydanticVectorStore, VectorStoreQuery, VectorStoreQueryResult
+from music_assistant.ann import train_ivf, normalize_rows
+from music_assistant.config import get_agent_settings
+
+SETTINGS = get_agent_settings()
+
+# Archivos del snapshot binario:
+#   meta.json       dimension, numero de vectores, dtype y numero de listas IVF
+#   embeddings.bin  matriz (count, dim) float32 o int8, filas normalizadas y ordenadas por lista IVF
+#   scales.bin      escala float32 por fila, solo con int8
+#   centroids.bin   centroides IVF (nlist, dim) float32
+#   offsets.bin     inicio de cada lista IVF dentro de embeddings.bin, int64 (nlist + 1)
+#   nodes.sqlite    posicion -> nodo serializado (texto, metadata, relaciones)
+SNAPSHOT_DIRNAME = "snapshot"
+
+
+class ReadOnlyVectorStoreError(ValueError):
+    pass
+
+
+def convert_persist_dir(store_path: str, snapshot_dir: str | None = None, quantize: bool = SETTINGS.snapshot_quantize) -> str:
+    """
+    Converts a llama-index JSON persist dir (default__vector_store.json + docstore.json) to a binary snapshot.
+    The snapshot is written to a temporary directory and renamed at the end, readers never see half of it.
+    """
+    snapshot_dir = snapshot_dir or os.path.join(store_path, SNAPSHOT_DIRNAME)
+    vector_store = SimpleVectorStore.from_persist_dir(store_path)
+    docstore = SimpleDocumentStore.from_persist_dir(store_path)
+
+    node_ids = list(vector_store.data.embedding_dict)
+    matrix = normalize_rows(np.asarray([vector_store.data.embedding_dict[node_id] for node_id in node_ids], dtype=np.float32))
+
+    offsets = np.asarray([0, len(node_ids)], dtype=np.int64)
+    centroids = None
+    if len(node_ids) >= SETTINGS.ann_min_vectors:
+        centroids, assignments = train_ivf(matrix, SETTINGS.ann_nlist)
+        order = np.argsort(assignments, kind="stable")
+        matrix = matrix[order]
+        node_ids = [node_ids[index] for index in order]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=len(centroids)))]).astype(np.int64)
+
+    tmp_dir = snapshot_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    if quantize:
+        scales = np.abs(matrix).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        np.round(matrix / scales[:, None]).astype(np.int8).tofile(os.path.join(tmp_dir, "embeddings.bin"))
+        scales.astype(np.float32).tofile(os.path.join(tmp_dir, "scales.bin"))
+    else:
+        matrix.tofile(os.path.join(tmp_dir, "embeddings.bin"))
+    if centroids is not None:
+        centroids.astype(np.float32).tofile(os.path.join(tmp_dir, "centroids.bin"))
+    offsets.tofile(os.path.join(tmp_dir, "offsets.bin"))
+
+    db = sqlite3.connect(os.path.join(tmp_dir, "nodes.sqlite"))
+    db.execute("CREATE TABLE nodes (position INTEGER PRIMARY KEY, node_id TEXT NOT NULL, node_json TEXT NOT NULL)")
+    db.executemany(
+        "INSERT INTO nodes (position, node_id, node_json) VALUES (?, ?, ?)",
+        ((position, node_id, json.dumps(doc_to_json(docstore.get_node(node_id)))) for position, node_id in enumerate(node_ids)),
+    )
+    db.commit()
+    db.close()
+
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as file:
+        json.dump({
+            "dim": int(matrix.shape[1]) if len(node_ids) else 0,
+            "count": len(node_ids),
+            "dtype": "int8" if quantize else "float32",
+            "nlist": 0 if centroids is None else len(centroids),
+        }, file)
+
+    old_dir = snapshot_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(snapshot_dir):
+        os.rename(snapshot_dir, old_dir)
+    os.rename(tmp_dir, snapshot_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return snapshot_dir
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """
+    Read-only vector store over a binary snapshot. The embedding matrix is opened with mmap, so every
+    process that loads the same snapshot shares its pages instead of parsing and copying the JSON store.
+    Nodes are stored with the snapshot, only the top-k results are read from `nodes.sqlite`.
+
+    Queries with metadata filters or node ids are answered with an exact search over the matching nodes,
+    their metadata is read from `nodes.sqlite` the first time. Adding or deleting nodes raises
+    `ReadOnlyVectorStoreError`, the snapshot is rebuilt from the JSON store by the ingestion.
+    """
+
+    stores_text: bool = True
+    snapshot_dir: str
+    nprobe: int = 8
+
+    _meta: dict = PrivateAttr()
+    _matrix: np.ndarray = PrivateAttr()
+    _scales: np.ndarray | None = PrivateAttr(default=None)
+    _centroids: np.ndarray | None = PrivateAttr(default=None)
+    _offsets: np.ndarray = PrivateAttr()
+    _db: sqlite3.Connection = PrivateAttr()
+    _node_metadata: dict[str, tuple[int, dict]] | None = PrivateAttr(default=None)  # node_id -> (posicion, metadata)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, snapshot_dir: str, nprobe: int = SETTINGS.ann_nprobe, **kwargs: Any):
+        super().__init__(snapshot_dir=snapshot_dir, nprobe=nprobe, **kwargs)
+        with open(os.path.join(snapshot_dir, "meta.json")) as file:
+            self._meta = json.load(file)
+        count, dim = self._meta["count"], self._meta["dim"]
+
+        self._matrix = np.memmap(
+            os.path.join(snapshot_dir, "embeddings.bin"), dtype=self._meta["dtype"], mode="r", shape=(count, dim)
+        ) if count else np.zeros((0, dim), dtype=np.float32)
+        if self._meta["dtype"] == "int8" and count:
+            self._scales = np.fromfile(os.path.join(snapshot_dir, "scales.bin"), dtype=np.float32)
+        if self._meta["nlist"]:
+            self._centroids = np.fromfile(os.path.join(snapshot_dir, "centroids.bin"), dtype=np.float32).reshape(-1, dim)
+        self._offsets = np.fromfile(os.path.join(snapshot_dir, "offsets.bin"), dtype=np.int64)
+        self._db = sqlite3.connect(
+            f"file:{os.path.join(snapshot_dir, 'nodes.sqlite')}?mode=ro", uri=True, check_same_thread=False
+        )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    def add(self, nodes: list[BaseNode], **add_kwargs: Any) -> list[str]:
+        raise ReadOnlyVectorStoreError("MmapVectorStore is read-only, rebuild the snapshot with convert_persist_dir.")
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        raise ReadOnlyVectorStoreError("MmapVectorStore is read-only, rebuild the snapshot with convert_persist_dir.")
+
+    def _score(self, start: int, end: int, query_vector: np.ndarray) -> np.ndarray:
+        scores = np.asarray(self._matrix[start:end], dtype=np.float32) @ query_vector
+        if self._scales is not None:
+            scores *= self._scales[start:end]
+        return scores
+
+    def _get_node_metadata(self) -> dict[str, tuple[int, dict]]:
+        with self._lock:
+            if self._node_metadata is None:
+                self._node_metadata = {
+                    node_id: (position, json_to_doc(json.loads(node_json)).metadata)
+                    for position, node_id, node_json in self._db.execute("SELECT position, node_id, node_json FROM nodes")
+                }
+            return self._node_metadata
+
+    def _filtered_positions(self, query: VectorStoreQuery) -> np.ndarray:
+        node_metadata = self._get_node_metadata()
+        filter_fn = _build_metadata_filter_fn(lambda node_id: node_metadata[node_id][1], query.filters)
+        node_ids = query.node_ids or node_metadata.keys()
+        return np.asarray(
+            sorted(node_metadata[node_id][0] for node_id in node_ids if node_id in node_metadata and filter_fn(node_id)),
+            dtype=np.int64,
+        )
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if not self._meta["count"]:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        query_vector = np.asarray(query.query_embedding, dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+
+        # VectorStoreIndex.from_vector_store pasa node_ids=[], eso no es una restriccion
+        if query.filters is not None or query.node_ids:
+            # Busqueda exacta sobre los nodos que cumplen los filtros
+            positions = self._filtered_positions(query)
+            scores = np.asarray(self._matrix[positions], dtype=np.float32) @ query_vector
+            if self._scales is not None:
+                scores *= self._scales[positions]
+            return self._result(positions, scores, query.similarity_top_k)
+
+        if self._centroids is None:
+            ranges = [(0, self._meta["count"])]
+        else:
+            nprobe = min(self.nprobe, len(self._centroids))
+            closest_lists = np.argpartition(-(self._centroids @ query_vector), nprobe - 1)[:nprobe]
+            # Cada lista es un bloque contiguo del archivo, se leen solo esas paginas
+            ranges = [(self._offsets[index], self._offsets[index + 1]) for index in closest_lists]
+
+        positions = np.concatenate([np.arange(start, end) for start, end in ranges])
+        scores = np.concatenate([self._score(start, end, query_vector) for start, end in ranges])
+        return self._result(positions, scores, query.similarity_top_k)
+
+    def _result(self, positions: np.ndarray, scores: np.ndarray, similarity_top_k: int) -> VectorStoreQueryResult:
+        top_k = min(similarity_top_k, len(positions))
+        if top_k == 0:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+
+        top_positions = [int(positions[index]) for index in top]
+        with self._lock:
+            rows = dict(
+                (position, (node_id, node_json))
+                for position, node_id, node_json in self._db.execute(
+                    f"SELECT position, node_id, node_json FROM nodes WHERE position IN ({','.join('?' * len(top_positions))})",
+                    top_positions,
+                )
+            )
+        return VectorStoreQueryResult(
+            nodes=[json_to_doc(json.loads(rows[position][1])) for position in top_positions],
+            similarities=scores[top].tolist(),
+            ids=[rows[position][0] for position in top_positions],
+        )
+
+
+if __name__ == "__main__":
+    # uv run python -m music_assistant.snapshot .cache/libros_embeddings
+    for store_path in sys.argv[1:] or [SETTINGS.music_assistant_store_path]:
+        print(f"{store_path}: snapshot written to {convert_persist_dir(store_path)}")
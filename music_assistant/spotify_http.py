@@ -0,0 +1,163 @@
+import time
+import random
+import threading
+from concurrent.futures import Future
+from functools import cache
+import requests
+import spotipy
+from requests.adapters import HTTPAdapter
+from spotipy.exceptions import SpotifyException
+from music_assistant.config import get_agent_settings
+
+SETTINGS = get_agent_settings()
+
+# Errores de Spotify que se reintentan, 429 respeta Retry-After
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every Spotify client of the process: `rate` requests per second on average,
+    bursts of up to `capacity`. A 429 pauses the whole bucket for its Retry-After.
+    Keeps the number of threads waiting for a token (queue depth) and how long they waited.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        start = time.monotonic()
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if now >= self._paused_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+                time.sleep(delay)
+        finally:
+            waited = time.monotonic() - start
+            with self._lock:
+                self.queue_depth -= 1
+                self.acquired += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "acquired": self.acquired,
+                "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+spotify_bucket = TokenBucket(SETTINGS.spotify_rate_limit, SETTINGS.spotify_burst)
+
+
+@cache
+def get_spotify_session() -> requests.Session:
+    # Una sola sesion (pool de conexiones keep-alive) para todos los clientes, los reintentos los hace RateLimitedSpotify
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SETTINGS.spotify_pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RateLimitedSpotify(spotipy.Spotify):
+    """
+    spotipy client on the shared session that waits for `bucket` before every request, retries 429 and
+    5xx responses honoring Retry-After with jittered exponential backoff, and coalesces concurrent
+    identical GETs (same URL, params and credentials) into one upstream request.
+    """
+
+    _in_flight: dict[tuple, Future] = {}
+    _in_flight_lock = threading.Lock()
+    coalesced = 0
+    throttled = 0
+    retried = 0
+
+    def __init__(self, *args, bucket: TokenBucket = spotify_bucket, **kwargs):
+        kwargs.setdefault("requests_session", get_spotify_session())
+        kwargs.setdefault("requests_timeout", SETTINGS.spotify_timeout)
+        super().__init__(*args, **kwargs)
+        self.bucket = bucket
+
+    def _internal_call(self, method, url, payload, params):
+        if method != "GET":
+            return self._call_with_retries(method, url, payload, params)
+
+        key = (url, tuple(sorted((name, str(value)) for name, value in params.items())), self._auth_headers().get("Authorization"))
+        with RateLimitedSpotify._in_flight_lock:
+            future = RateLimitedSpotify._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                RateLimitedSpotify._in_flight[key] = future
+            else:
+                RateLimitedSpotify.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._call_with_retries(method, url, payload, params)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with RateLimitedSpotify._in_flight_lock:
+                del RateLimitedSpotify._in_flight[key]
+
+    def _call_with_retries(self, method, url, payload, params):
+        for attempt in range(SETTINGS.spotify_max_retries + 1):
+            self.bucket.acquire()
+            try:
+                # spotipy borra content_type de params, cada intento recibe su copia
+                return super()._internal_call(method, url, payload, dict(params))
+            except SpotifyException as e:
+                if e.http_status not in RETRY_STATUSES or attempt == SETTINGS.spotify_max_retries:
+                    raise
+                delay = random.uniform(0, min(SETTINGS.spotify_backoff_max, SETTINGS.spotify_backoff_base * 2 ** attempt))
+                if e.http_status == 429:
+                    RateLimitedSpotify.throttled += 1
+                    retry_after = (e.headers or {}).get("Retry-After")
+                    if retry_after is not None:
+                        # Se detienen todas las peticiones, no solo esta
+                        delay = float(retry_after) + random.uniform(0, SETTINGS.spotify_backoff_base)
+                        self.bucket.pause(delay)
+                RateLimitedSpotify.retried += 1
+                time.sleep(delay)
+
+
+def spotify_http_stats() -> dict:
+    return {
+        **spotify_bucket.stats(),
+        "coalesced": RateLimitedSpotify.coalesced,
+        "throttled": RateLimitedSpotify.throttled,
+        "retried": RateLimitedSpotify.retried,
+    }
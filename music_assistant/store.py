@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import uuid
+from datetime import date, datetime
+from functools import cache
+from collections.abc import Callable
+from piccolo.table import create_db_tables_sync
+from piccolo.engine.sqlite import TransactionType
+from music_assistant.tables import (
+    DB,
+    TABLES,
+    User,
+    Snapshot,
+    Track,
+    Artist as ArtistRow,
+    Genre,
+    SnapshotTrack,
+    SnapshotArtist,
+    SnapshotGenre,
+    TasteDrift,
+)
+from music_assistant.models import (
+    Song,
+    Artist,
+    UserInformationTopTracks,
+    UserInformationTopGenres,
+    UserInformationTopArtists,
+    UserInformation,
+)
+from music_assistant.config import get_agent_settings
+
+SETTINGS = get_agent_settings()
+
+# Se llaman con cada snapshot despues de guardarlo, para actualizar indices derivados del store
+_snapshot_listeners: list[Callable[[UserInformation], None]] = []
+
+
+def add_snapshot_listener(listener: Callable[[UserInformation], None]):
+    _snapshot_listeners.append(listener)
+
+
+@cache
+def ensure_schema():
+    create_db_tables_sync(*TABLES, if_not_exists=True)
+
+
+def save_snapshots(snapshots: list[UserInformation]):
+    """
+    Appends the snapshots to the store in a single transaction. Tracks, artists and genres are
+    upserted, so they are stored only once no matter how many snapshots reference them.
+    """
+    ensure_schema()
+    transaction = DB.atomic(transaction_type=TransactionType.immediate)
+
+    for information in snapshots:
+        snapshot_id = uuid.uuid4()
+        transaction.add(
+            User.insert(User(username=information.username)).on_conflict(action="DO NOTHING"),
+            Snapshot.insert(Snapshot(
+                id=snapshot_id,
+                user=information.username,
+                date=information.date,
+                created_at=datetime.now(),
+                time_ranges=json.dumps({
+                    time_range: ranks.model_dump() for time_range, ranks in information.time_ranges.items()
+                }) if information.time_ranges else None,
+            )),
+        )
+
+        tracks = information.top_tracks.top_tracks
+        if tracks:
+            transaction.add(
+                Track.insert(*[Track(id=song.id, name=song.name, artist=song.artist) for song in tracks])
+                .on_conflict(action="DO NOTHING"),
+                SnapshotTrack.insert(*[
+                    SnapshotTrack(snapshot=snapshot_id, track=song.id, rank=rank) for rank, song in enumerate(tracks)
+                ]),
+            )
+
+        artists = information.top_artists.top_artists
+        if artists:
+            transaction.add(
+                ArtistRow.insert(*[
+                    ArtistRow(id=artist.id, name=artist.name, genres=json.dumps(artist.genres)) for artist in artists
+                ]).on_conflict(
+                    target=ArtistRow.id,
+                    action="DO UPDATE",
+                    values=[ArtistRow.name, ArtistRow.genres],
+                ),
+                SnapshotArtist.insert(*[
+                    SnapshotArtist(snapshot=snapshot_id, artist=artist.id, rank=rank) for rank, artist in enumerate(artists)
+                ]),
+            )
+
+        genres = information.top_genres.top_genres
+        if genres:
+            transaction.add(
+                Genre.insert(*[Genre(name=genre) for genre in genres]).on_conflict(action="DO NOTHING"),
+                SnapshotGenre.insert(*[
+                    SnapshotGenre(snapshot=snapshot_id, genre=genre, rank=rank) for rank, genre in enumerate(genres)
+                ]),
+            )
+
+    transaction.run_sync()
+    for information in snapshots:
+        for listener in _snapshot_listeners:
+            listener(information)
+
+
+def save_snapshot(information: UserInformation):
+    save_snapshots([information])
+
+
+def get_last_saved(username: str) -> datetime | None:
+    """
+    When the last snapshot of `username` was saved, None without snapshots.
+    """
+    ensure_schema()
+    row = (
+        Snapshot.select(Snapshot.created_at)
+        .where(Snapshot.user == username)
+        .order_by(Snapshot.created_at, ascending=False)
+        .first()
+        .run_sync()
+    )
+    return row["created_at"] if row else None
+
+
+def get_store_version(username: str) -> tuple:
+    """
+    Changes every time a snapshot is saved for `username`, useful as a memoization key.
+    """
+    last_saved = get_last_saved(username)
+    count = Snapshot.count().where(Snapshot.user == username).run_sync()
+    return (count, last_saved)
+
+
+def list_users() -> list[str]:
+    ensure_schema()
+    return [row["username"] for row in User.select(User.username).run_sync()]
+
+
+def has_snapshots(username: str) -> bool:
+    ensure_schema()
+    return Snapshot.exists().where(Snapshot.user == username).run_sync()
+
+
+def read_snapshots(username: str, limit: int | None = None, since: date | None = None) -> list[UserInformation]:
+    """
+    Returns the user's snapshots in chronological order. Only the `limit` most recent ones
+    (and only those from `since` on) are read from the store.
+    """
+    ensure_schema()
+    query = (
+        Snapshot.select(Snapshot.id, Snapshot.date, Snapshot.time_ranges)
+        .where(Snapshot.user == username)
+        .order_by(Snapshot.date, Snapshot.created_at, ascending=False)
+    )
+    if since is not None:
+        query = query.where(Snapshot.date >= since)
+    if limit is not None:
+        query = query.limit(limit)
+    return _build_snapshots(username, list(reversed(query.run_sync())))
+
+
+def _build_snapshots(username: str, snapshot_rows: list[dict]) -> list[UserInformation]:
+    if not snapshot_rows:
+        return []
+
+    snapshot_ids = [row["id"] for row in snapshot_rows]
+    tracks = {snapshot_id: [] for snapshot_id in snapshot_ids}
+    for row in (
+        SnapshotTrack.select(SnapshotTrack.snapshot, SnapshotTrack.track.id, SnapshotTrack.track.name, SnapshotTrack.track.artist)
+        .where(SnapshotTrack.snapshot.is_in(snapshot_ids))
+        .order_by(SnapshotTrack.rank)
+        .run_sync()
+    ):
+        tracks[row["snapshot"]].append(Song(id=row["track.id"], name=row["track.name"], artist=row["track.artist"]))
+
+    artists = {snapshot_id: [] for snapshot_id in snapshot_ids}
+    for row in (
+        SnapshotArtist.select(SnapshotArtist.snapshot, SnapshotArtist.artist.id, SnapshotArtist.artist.name, SnapshotArtist.artist.genres)
+        .where(SnapshotArtist.snapshot.is_in(snapshot_ids))
+        .order_by(SnapshotArtist.rank)
+        .run_sync()
+    ):
+        genres = json.loads(row["artist.genres"]) if row["artist.genres"] else None
+        artists[row["snapshot"]].append(Artist(id=row["artist.id"], name=row["artist.name"], genres=genres))
+
+    genres = {snapshot_id: [] for snapshot_id in snapshot_ids}
+    for row in (
+        SnapshotGenre.select(SnapshotGenre.snapshot, SnapshotGenre.genre)
+        .where(SnapshotGenre.snapshot.is_in(snapshot_ids))
+        .order_by(SnapshotGenre.rank)
+        .run_sync()
+    ):
+        genres[row["snapshot"]].append(row["genre"])
+
+    snapshots = []
+    for row in snapshot_rows:
+        snapshot_id = row["id"]
+        snapshots.append(UserInformation(
+            username=username,
+            date=row["date"],
+            top_tracks=UserInformationTopTracks(num=len(tracks[snapshot_id]), top_tracks=tracks[snapshot_id]),
+            top_artists=UserInformationTopArtists(num=len(artists[snapshot_id]), top_artists=artists[snapshot_id]),
+            top_genres=UserInformationTopGenres(num=len(genres[snapshot_id]), top_genres=genres[snapshot_id]),
+            time_ranges=json.loads(row["time_ranges"]) if row["time_ranges"] else None,
+        ))
+    return snapshots
+
+
+def read_snapshots_after(username: str, after: tuple[date, datetime] | None = None) -> list[tuple[tuple[date, datetime], UserInformation]]:
+    """
+    The user's snapshots that come after the `(date, created_at)` key `after` in chronological order,
+    with their keys. Every snapshot if `after` is None.
+    """
+    ensure_schema()
+    query = (
+        Snapshot.select(Snapshot.id, Snapshot.date, Snapshot.created_at, Snapshot.time_ranges)
+        .where(Snapshot.user == username)
+        .order_by(Snapshot.date, Snapshot.created_at)
+    )
+    if after is not None:
+        snapshot_date, created_at = after
+        query = query.where((Snapshot.date > snapshot_date) | ((Snapshot.date == snapshot_date) & (Snapshot.created_at > created_at)))
+    snapshot_rows = query.run_sync()
+    keys = [(row["date"], row["created_at"]) for row in snapshot_rows]
+    return list(zip(keys, _build_snapshots(username, snapshot_rows)))
+
+
+def count_snapshots_until(username: str, until: tuple[date, datetime]) -> int:
+    """
+    Number of the user's snapshots up to the `(date, created_at)` key `until`, included.
+    """
+    ensure_schema()
+    snapshot_date, created_at = until
+    return (
+        Snapshot.count()
+        .where(Snapshot.user == username)
+        .where((Snapshot.date < snapshot_date) | ((Snapshot.date == snapshot_date) & (Snapshot.created_at <= created_at)))
+        .run_sync()
+    )
+
+
+def read_latest_snapshot(username: str) -> UserInformation | None:
+    snapshots = read_snapshots(username, limit=1)
+    return snapshots[0] if snapshots else None
+
+
+def read_catalog() -> tuple[list[Song], list[Artist]]:
+    """
+    Every track and artist stored for any user.
+    """
+    ensure_schema()
+    songs = [Song(id=row["id"], name=row["name"], artist=row["artist"]) for row in Track.select().run_sync()]
+    artists = [
+        Artist(id=row["id"], name=row["name"], genres=json.loads(row["genres"]) if row["genres"] else None)
+        for row in ArtistRow.select().run_sync()
+    ]
+    return songs, artists
+
+
+def read_drift_state(username: str) -> str | None:
+    ensure_schema()
+    row = TasteDrift.select(TasteDrift.state).where(TasteDrift.username == username).first().run_sync()
+    return row["state"] if row else None
+
+
+def save_drift_state(username: str, state: str):
+    ensure_schema()
+    TasteDrift.insert(TasteDrift(username=username, state=state)).on_conflict(
+        target=TasteDrift.username, action="DO UPDATE", values=[TasteDrift.state]
+    ).run_sync()
+
+
+def import_json_history(filename: str) -> int:
+    """
+    One-time import of a `<username>.json` history written by the old `save_user_information`.
+    Users that already have snapshots in the store are skipped. Returns the number of imported snapshots.
+    """
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        return 0
+    with open(filename, "r") as file:
+        try:
+            user_data_list = json.load(file)
+        except json.JSONDecodeError:
+            return 0
+
+    snapshots = [UserInformation.model_validate(user_data) for user_data in user_data_list]
+    already_imported = {information.username for information in snapshots if has_snapshots(information.username)}
+    snapshots = [information for information in snapshots if information.username not in already_imported]
+    if snapshots:
+        save_snapshots(snapshots)
+    return len(snapshots)
+
+
+def ensure_user_imported(username: str):
+    """
+    Imports `<username>.json` the first time the user is read from the store.
+    """
+    if not has_snapshots(username):
+        import_json_history(username + SETTINGS.log_file)
+
+
+if __name__ == "__main__":
+    # uv run python -m music_assistant.store FER.json "Mateo Michel.json"
+    for filename in sys.argv[1:] or [SETTINGS.username + SETTINGS.log_file]:
+        print(f"{filename}: imported {import_json_history(filename)} snapshots")
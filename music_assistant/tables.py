@@ -0,0 +1,62 @@
+from piccolo.engine.sqlite import SQLiteEngine
+from piccolo.table import Table
+from piccolo.columns import Varchar, Date, Timestamp, ForeignKey, Integer, UUID, JSON
+from music_assistant.config import get_agent_settings
+
+SETTINGS = get_agent_settings()
+
+DB = SQLiteEngine(path=SETTINGS.user_store_path)
+
+
+class User(Table, tablename="users", db=DB):
+    username = Varchar(length=255, primary_key=True)
+
+
+class Snapshot(Table, db=DB):
+    id = UUID(primary_key=True)
+    user = ForeignKey(references=User, index=True)
+    date = Date(index=True)
+    created_at = Timestamp()
+    time_ranges = JSON(null=True)
+
+
+class Track(Table, db=DB):
+    id = Varchar(length=64, primary_key=True)
+    name = Varchar(length=512)
+    artist = Varchar(length=512)
+
+
+class Artist(Table, db=DB):
+    id = Varchar(length=64, primary_key=True)
+    name = Varchar(length=512)
+    genres = JSON(null=True)
+
+
+class Genre(Table, db=DB):
+    name = Varchar(length=255, primary_key=True)
+
+
+class SnapshotTrack(Table, db=DB):
+    snapshot = ForeignKey(references=Snapshot, index=True)
+    track = ForeignKey(references=Track)
+    rank = Integer()
+
+
+class SnapshotArtist(Table, db=DB):
+    snapshot = ForeignKey(references=Snapshot, index=True)
+    artist = ForeignKey(references=Artist)
+    rank = Integer()
+
+
+class SnapshotGenre(Table, db=DB):
+    snapshot = ForeignKey(references=Snapshot, index=True)
+    genre = ForeignKey(references=Genre)
+    rank = Integer()
+
+
+class TasteDrift(Table, tablename="taste_drift", db=DB):
+    username = Varchar(length=255, primary_key=True)
+    state = JSON()
+
+
+TABLES = [User, Snapshot, Track, Artist, Genre, SnapshotTrack, SnapshotArtist, SnapshotGenre, TasteDrift]
@@ -0,0 +1,132 @@
+import threading
+import numpy as np
+from scipy import sparse
+from music_assistant.models import UserInformation
+from music_assistant.store import add_snapshot_listener, list_users, read_latest_snapshot
+from music_assistant.digest import score_ranked_items
+from music_assistant.recommender import artist_key
+from music_assistant.config import get_agent_settings
+from music_assistant.cache import locked_cache
+
+SETTINGS = get_agent_settings()
+
+
+class TasteIndex:
+    """
+    One sparse taste vector per user, built from their latest snapshot: each artist and genre weighs
+    more the higher it is ranked, genres are scaled by `genre_weight`. Vectors are L2-normalized, so the
+    similarity between two users is the dot product of their rows.
+
+    A user's vector is recomputed only when one of their snapshots is saved, the other users are not read
+    again. The users x features matrix is rebuilt from the stored vectors on the next query.
+    """
+
+    def __init__(self, genre_weight: float = 0.5):
+        self.genre_weight = genre_weight
+        self.feature_columns: dict[tuple[str, str], int] = {}
+        self.artist_names: dict[int, str] = {}  # columna -> nombre del artista
+        self.user_rows: dict[str, int] = {}
+        self.usernames: list[str] = []
+        self._vectors: list[dict[int, float]] = []
+        self._dates: list = []
+        self._matrix: sparse.csr_matrix | None = None
+        self._lock = threading.RLock()
+
+    def _column(self, feature: tuple[str, str]) -> int:
+        return self.feature_columns.setdefault(feature, len(self.feature_columns))
+
+    def add_snapshot(self, information: UserInformation):
+        with self._lock:
+            row = self.user_rows.get(information.username)
+            # Las importaciones de historial llegan en orden, pero un snapshot viejo no reemplaza al ultimo
+            if row is not None and information.date < self._dates[row]:
+                return
+
+            vector: dict[int, float] = {}
+            artists = [artist.name for artist in information.top_artists.top_artists]
+            for name, score in score_ranked_items([artists]).items():
+                column = self._column(("artist", artist_key(name)))
+                self.artist_names.setdefault(column, name)
+                vector[column] = vector.get(column, 0.0) + score
+            for genre, score in score_ranked_items([information.top_genres.top_genres]).items():
+                column = self._column(("genre", genre))
+                vector[column] = vector.get(column, 0.0) + self.genre_weight * score
+            norm = np.sqrt(sum(value * value for value in vector.values())) or 1.0
+            vector = {column: value / norm for column, value in vector.items()}
+
+            if row is None:
+                self.user_rows[information.username] = len(self.usernames)
+                self.usernames.append(information.username)
+                self._vectors.append(vector)
+                self._dates.append(information.date)
+            else:
+                self._vectors[row] = vector
+                self._dates[row] = information.date
+            self._matrix = None
+
+    def _get_matrix(self) -> sparse.csr_matrix:
+        if self._matrix is None:
+            rows = [row for row, vector in enumerate(self._vectors) for _ in vector]
+            columns = [column for vector in self._vectors for column in vector]
+            values = [value for vector in self._vectors for value in vector.values()]
+            self._matrix = sparse.csr_matrix(
+                (np.asarray(values, dtype=np.float32), (rows, columns)),
+                shape=(len(self.usernames), len(self.feature_columns)),
+            )
+        return self._matrix
+
+    def _user_row(self, username: str) -> int | None:
+        if username not in self.user_rows:
+            information = read_latest_snapshot(username)
+            if information is None:
+                return None
+            self.add_snapshot(information)
+        return self.user_rows[username]
+
+    def similar_users(self, username: str, top_k: int = 5) -> list[tuple[str, float]]:
+        """
+        The `top_k` users with the closest taste to `username`, as (username, cosine similarity).
+        """
+        with self._lock:
+            row = self._user_row(username)
+            if row is None:
+                return []
+            matrix = self._get_matrix()
+            scores = (matrix @ matrix[row].T).toarray().ravel()
+            scores[row] = -1.0
+            top_k = min(top_k, len(scores) - 1)
+            if top_k <= 0:
+                return []
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+            candidates = candidates[np.argsort(-scores[candidates])]
+            return [(self.usernames[index], float(scores[index])) for index in candidates if scores[index] > 0]
+
+    def neighbour_artists(self, username: str, top_k: int = 5, limit: int = 20) -> list[tuple[str, float]]:
+        """
+        Artists the user doesn't have among their top artists that are popular among their `top_k` most
+        similar users, as (artist name, score). Each neighbour's artists count as much as the neighbour is similar.
+        """
+        with self._lock:
+            neighbours = self.similar_users(username, top_k)
+            if not neighbours:
+                return []
+            own_columns = set(self._vectors[self.user_rows[username]])
+            scores: dict[int, float] = {}
+            for neighbour, similarity in neighbours:
+                for column, value in self._vectors[self.user_rows[neighbour]].items():
+                    if column in self.artist_names and column not in own_columns:
+                        scores[column] = scores.get(column, 0.0) + similarity * value
+            ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+            return [(self.artist_names[column], scores[column]) for column in ranked]
+
+
+@locked_cache
+def get_taste_index() -> TasteIndex:
+    index = TasteIndex(SETTINGS.taste_genre_weight)
+    for username in list_users():
+        information = read_latest_snapshot(username)
+        if information is not None:
+            index.add_snapshot(information)
+    # Cada snapshot nuevo actualiza solo el vector de su usuario
+    add_snapshot_listener(index.add_snapshot)
+    return index
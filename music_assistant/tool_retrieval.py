@@ -0,0 +1,74 @@
+import threading
+from collections.abc import Callable
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import QueryBundle
+from llama_index.core.tools import BaseTool
+from music_assistant.ann import normalize_rows
+from music_assistant.utils import estimate_tokens
+
+
+def tool_prompt_text(tool: BaseTool) -> str:
+    # Lo que el agente manda al LLM por cada herramienta: nombre, descripcion y esquema de argumentos
+    return f"{tool.metadata.name}\n{tool.metadata.description}\n{tool.metadata.fn_schema_str}"
+
+
+class ToolRetriever:
+    """
+    Picks the tools the agent sees for a user message: the `top_k` whose description is the most similar
+    to the message, plus the `always_include` ones. Tool descriptions are embedded once, on first use.
+    Tracks the prompt tokens saved against sending every tool on every step.
+    """
+
+    def __init__(
+        self,
+        tools: list[BaseTool],
+        embed_model_factory: Callable[[], BaseEmbedding],
+        top_k: int = 4,
+        always_include: list[str] | None = None,
+    ):
+        self.tools = tools
+        self.embed_model_factory = embed_model_factory
+        self.top_k = top_k
+        self.always_include = set(always_include or [])
+        self._tool_tokens = [estimate_tokens(tool_prompt_text(tool)) for tool in tools]
+        self._matrix: np.ndarray | None = None
+        self._lock = threading.Lock()
+        self.retrievals = 0
+        self.tokens_all = 0
+        self.tokens_selected = 0
+
+    def _get_matrix(self) -> np.ndarray:
+        with self._lock:
+            if self._matrix is None:
+                embeddings = self.embed_model_factory().get_text_embedding_batch(
+                    [tool_prompt_text(tool) for tool in self.tools]
+                )
+                self._matrix = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+            return self._matrix
+
+    def retrieve(self, message: str | QueryBundle) -> list[BaseTool]:
+        query_str = message.query_str if isinstance(message, QueryBundle) else message
+        query_vector = np.asarray(self.embed_model_factory().get_query_embedding(query_str), dtype=np.float32)
+        scores = self._get_matrix() @ query_vector
+
+        selected = {index for index, tool in enumerate(self.tools) if tool.metadata.name in self.always_include}
+        selected.update(int(index) for index in np.argsort(-scores)[:self.top_k])
+        # Mismo orden que el registro, el prompt no cambia con el orden de los scores
+        selected = sorted(selected)
+
+        with self._lock:
+            self.retrievals += 1
+            self.tokens_all += sum(self._tool_tokens)
+            self.tokens_selected += sum(self._tool_tokens[index] for index in selected)
+        return [self.tools[index] for index in selected]
+
+    def report(self) -> str:
+        saved = self.tokens_all - self.tokens_selected
+        lines = ["Tool retrieval:"]
+        lines.append(f"  - retrievals (agent steps): {self.retrievals}")
+        lines.append(f"  - tool description tokens sent: {self.tokens_selected} of {self.tokens_all}")
+        lines.append(
+            f"  - tokens saved: {saved} ({saved / self.tokens_all:.0%})" if self.tokens_all else "  - tokens saved: 0"
+        )
+        return "\n".join(lines)
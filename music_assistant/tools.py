@@ -1,11 +1,10 @@
-import json
 import spotipy
-import os
-from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from random import randint
 from datetime import date, datetime, time
-from llama_index.core.tools import QueryEngineTool, FunctionTool, ToolMetadata
-from music_assistant.rags import MusicRAG
+from llama_index.core.tools import ToolMetadata
+from music_assistant.rags import MusicRAG, get_llm
 from music_assistant.prompts import music_query_qa_tpl, music_query_description
 from music_assistant.config import get_agent_settings
 from music_assistant.models import (
@@ -17,57 +16,70 @@ from music_assistant.models import (
     UserInformationTopTracks,
     UserInformationTopGenres,
     UserInformationTopArtists,
+    UserInformationTimeRange,
     UserInformation
 )
 from music_assistant.objects import SpotifyObject
 from music_assistant.utils import save_user_information
-import wikipediaapi
-import lyricsgenius as lg
+from music_assistant.store import ensure_user_imported, has_snapshots, read_snapshots
+from music_assistant.digest import get_profile_digest
+from music_assistant.recommender import get_recommender
+from music_assistant.taste import get_taste_index
+from music_assistant.drift import drift_tracker, format_drift
+from music_assistant.wiki import fetch_wikipedia_sections, select_relevant_sections, get_wikipedia_client
+from music_assistant.lyrics import fetch_lyrics, fetch_lyrics_batch, get_genius
+from music_assistant.paging import iter_pages, PLAYLIST_TRACK_FIELDS
+from music_assistant.playlist_sync import sync_playlist
+from music_assistant.registry import ToolRegistry, LazyQueryEngineTool, CompactFunctionTool
+from music_assistant.cache import locked_cache
 
 SETTINGS = get_agent_settings()
-genius = lg.Genius(SETTINGS.genius_api_key)
-genius.remove_section_headers = True
 spotify_object = SpotifyObject()
 
 def set_spotify_credentials(client_id: str, client_secret: str, redirect_uri: str):
     
     spotify_object.set_spotify_credentials(client_id, client_secret, redirect_uri)
 
-music_query_tool = QueryEngineTool(
-    query_engine=MusicRAG(
+@locked_cache
+def get_music_query_engine():
+    return MusicRAG(
         store_path=SETTINGS.music_assistant_store_path,
         data_dir=SETTINGS.music_assistant_data_path,
         qa_prompt_tpl=music_query_qa_tpl,
-    ).get_query_engine(),
+        seed_path=SETTINGS.music_assistant_seed_path,
+    ).get_query_engine()
+
+music_query_tool = LazyQueryEngineTool(
+    query_engine_factory=get_music_query_engine,
     metadata=ToolMetadata(
         name="music_assistant", description=music_query_description, return_direct=False
     ),
 )
 
-def get_wikipedia_page(lookup_term: str) -> str:
+def get_wikipedia_page(lookup_term: str, query: str | None = None) -> str:
     """
     This tool is designed to retrieve the Wikipedia page for a given term. It allows the user to search for general information about artists, songs, albums, music genres, and other music-related topics.
 
     ### Usage
-    - Input: The tool requires one input:
+    - Input: The tool requires one input and accepts one optional input:
         1. **lookup_term**: The term to search for in Wikipedia (e.g., a song, an album, an artist, a music genre, discography, music labels, etc.).
+        2. **query** (optional): What the user wants to know about the term (e.g., "early career", "awards", "discography"). It is used to pick the most relevant sections of the page.
 
     ### Output
-    - The tool returns the full text of the Wikipedia page if found. If not, it returns a message saying no page was found.
+    - The tool returns the summary of the Wikipedia page plus the sections most relevant to the query, if found. If not, it returns a message saying no page was found.
 
     ### Notes
     - Use this tool to provide detailed background information or context about artists, songs, music genres, albums, etc. The input to the tool is the term that the user is interested in or other terms related to the topic.
+    - Pass a specific **query** to get the sections you need instead of only the summary.
     """
-    user_agent = 'MusicChatbot/1.0 (https://www.upb.edu/)'
-    wiki_wiki = wikipediaapi.Wikipedia(user_agent,'en')
-    page = wiki_wiki.page(lookup_term)
-    
-    if page.exists():
-        return page.text
+    sections = fetch_wikipedia_sections(lookup_term)
+
+    if sections:
+        return select_relevant_sections(sections, query or lookup_term)
     else:
         return f"No Wikipedia page found for {lookup_term}."
 
-wikipedia_tool = FunctionTool.from_defaults(fn=get_wikipedia_page, return_direct=False)
+wikipedia_tool = CompactFunctionTool.from_defaults(fn=get_wikipedia_page, return_direct=False)
 
 def get_lyrics_from_genius(song_title: str, artist_name: str) -> str:
     """
@@ -84,17 +96,9 @@ def get_lyrics_from_genius(song_title: str, artist_name: str) -> str:
     ### Notes
     - Use this tool to provide detailed lyrics about a song. The input to the tool is the title of the song and the name of the artist.
     """
-    try:
-        song = genius.search_song(song_title, artist_name)
-        if song:
-            return song.lyrics
-        else:
-            return None
-    except Exception as e:
-        print(f"Error fetching lyrics for {song_title} by {artist_name}: {e}")
-        return None
+    return fetch_lyrics(song_title, artist_name)
 
-lyrics_genius_tool = FunctionTool.from_defaults(fn=get_lyrics_from_genius, return_direct=False)
+lyrics_genius_tool = CompactFunctionTool.from_defaults(fn=get_lyrics_from_genius, return_direct=False)
 
 def create_Spotify_playlist(track_uris: list[str], playlist_name: str = "Music Assistant Recommendations", playlist_description: str = "Una playlist creada con Spotipy por el bot de Music Assistant"):
     """
@@ -107,21 +111,20 @@ def create_Spotify_playlist(track_uris: list[str], playlist_name: str = "Music A
         3. **playlist_description** (optional): A brief description of the playlist's content or purpose.
 
     ### Output
-    - The function returns a `Playlist` object representing the newly created playlist, including its ID, name, and the number of tracks added.
+    - The function returns a `Playlist` object representing the playlist, including its ID, name, and the number of tracks in it.
 
     ### Notes
     - This function is beneficial for users who wish to curate their own playlists based on specific themes, moods, or personal favorites.
+    - If the user already has a playlist with the same name, that playlist is updated so it contains exactly the given tracks instead of creating a duplicate.
     - IT CAN ONLY BE USED AFTER ASKING FOR THE PLAYLIST NAME AND PLAYLIST DESCRIPTION, AND GETTING THE LIST OF URIS.
     - Ask the user for the playlist name and description before using this tool.
 
     """
     sp = spotify_object.get_spotify_object()
-    user_id = sp.current_user()['id']
-    new_playlist = sp.user_playlist_create(user=user_id, name=playlist_name, public=False, description=playlist_description)
-    sp.playlist_add_items(playlist_id=new_playlist['id'], items=track_uris)
-    return Playlist(id=new_playlist['id'], name=new_playlist['name'], num_tracks=len(track_uris))
+    playlist, playlist_uris = sync_playlist(sp, playlist_name, track_uris, playlist_description)
+    return Playlist(id=playlist['id'], name=playlist['name'], num_tracks=len(playlist_uris))
 
-create_Spotify_playlist_tool = FunctionTool.from_defaults(fn=create_Spotify_playlist, return_direct=False)
+create_Spotify_playlist_tool = CompactFunctionTool.from_defaults(fn=create_Spotify_playlist, return_direct=False)
 
 def show_all_Spotify_playlists():
     """
@@ -137,36 +140,47 @@ def show_all_Spotify_playlists():
     - This tool is useful for users to view all their playlists and manage them effectively.
     """
     sp = spotify_object.get_spotify_object()
-    user_playlists = sp.current_user_playlists()
+    user_playlists = iter_pages(sp.current_user_playlists, page_size=50)
     list_of_playlists = []
-    for playlist in user_playlists['items']:
+    for playlist in user_playlists:
         list_of_playlists.append(Playlist(id=playlist['id'], name=playlist['name'], num_tracks=playlist['tracks']['total']))
     return list_of_playlists
 
-show_all_Spotify_playlists_tool = FunctionTool.from_defaults(fn=show_all_Spotify_playlists, return_direct=False)
+show_all_Spotify_playlists_tool = CompactFunctionTool.from_defaults(fn=show_all_Spotify_playlists, return_direct=False)
 
-def show_specific_Spotify_playlist_tracks(playlist_id: str):
+def show_specific_Spotify_playlist_tracks(playlist_id: str, include_lyrics: bool = False):
     """
     This function retrieves all the tracks from a specific Spotify playlist identified by its ID.
 
     ### Usage
-    - Input: The function requires one input:
+    - Input: The function requires one input and accepts one optional input:
         1. **playlist_id**: The ID of the playlist whose tracks you want to retrieve.
+        2. **include_lyrics** (optional): If True, the lyrics of every track are also retrieved. Default is False.
 
     ### Output
-    - The function returns a `PlaylistWithTracks` object containing the playlist details and a list of `Song` objects, each with information about the song and its lyrics.
+    - The function returns a `PlaylistWithTracks` object containing the playlist details and a list of `Song` objects, each with information about the song. If **include_lyrics** is True, it also contains the lyrics of each song by song ID.
 
     ### Notes
     - Use this tool to explore the contents of a specific playlist and get detailed information about each track, including lyrics.
+    - Only set **include_lyrics** to True when the user asks about the lyrics of the playlist.
     """
     sp = spotify_object.get_spotify_object()
-    playlist_tracks = sp.playlist_tracks(playlist_id)
+    playlist_tracks = iter_pages(
+        lambda limit, offset: sp.playlist_tracks(playlist_id, fields=PLAYLIST_TRACK_FIELDS, limit=limit, offset=offset),
+        page_size=100,
+    )
+    total = 0
     list_of_tracks = []
-    for track in playlist_tracks['items']:
+    for track in playlist_tracks:
+        total += 1
+        # Las canciones locales o eliminadas vienen sin track
+        if not track.get('track'):
+            continue
         list_of_tracks.append(Song(id=track['track']['id'], name=track['track']['name'], artist=track['track']['artists'][0]['name']))
-    return PlaylistWithTracks(id=playlist_id, total=playlist_tracks['total'], tracks=list_of_tracks)
+    lyrics = fetch_lyrics_batch(list_of_tracks) if include_lyrics else None
+    return PlaylistWithTracks(id=playlist_id, total=total, tracks=list_of_tracks, lyrics=lyrics)
 
-show_specific_Spotify_playlist_tracks_tool = FunctionTool.from_defaults(fn=show_specific_Spotify_playlist_tracks, return_direct=False)
+show_specific_Spotify_playlist_tracks_tool = CompactFunctionTool.from_defaults(fn=show_specific_Spotify_playlist_tracks, return_direct=False)
 
 def get_artist_Spotify(id: str):
     """
@@ -188,7 +202,7 @@ def get_artist_Spotify(id: str):
     artist = sp.artist(id)
     return Artist(id=artist['id'], name=artist['name'], genres=artist['genres'])
 
-get_artist_Spotify_tool = FunctionTool.from_defaults(fn=get_artist_Spotify, return_direct=False)
+get_artist_Spotify_tool = CompactFunctionTool.from_defaults(fn=get_artist_Spotify, return_direct=False)
 
 def get_several_artists_Spotify(ids: list[str]):
     """
@@ -211,57 +225,70 @@ def get_several_artists_Spotify(ids: list[str]):
         list_of_artists.append(Artist(id=artist['id'], name=artist['name'], genres=artist['genres']))
     return list_of_artists
 
-get_several_artists_Spotify_tool = FunctionTool.from_defaults(fn=get_several_artists_Spotify, return_direct=False)
+get_several_artists_Spotify_tool = CompactFunctionTool.from_defaults(fn=get_several_artists_Spotify, return_direct=False)
+
+TIME_RANGES = ['short_term', 'medium_term', 'long_term']
+
+def _get_top_tracks(sp, time_range: str) -> list[dict]:
+    return list(iter_pages(
+        lambda limit, offset: sp.current_user_top_tracks(limit=limit, offset=offset, time_range=time_range),
+        page_size=50,
+        max_items=SETTINGS.user_top_tracks_limit,
+    ))
 
 def get_user_information_from_Spotify():
 
     '''
-    This function retrieves user information from Spotify and stores it in a JSON file.
-    If the file already exists, it is skipped.
+    This function retrieves user information from Spotify and stores it in the user information database.
+    If the user information was already saved, it is skipped.
 
     ### Usage
     - Input: This function does not require any input parameters.
     ### Output: 
-    This function does not return any output. It stores user information in a JSON file.
+    This function does not return any output. It stores user information in the user information database.
 
     ### Notes
-    - This function is useful for storing user information in a JSON file for future use.
-    - It can only be executed if a json file with the same name as the username DOES NOT exist.
-    - If the file already exists, it is skipped.
+    - This function is useful for storing user information for future use.
+    - It can only be executed if there is NO saved information for the username.
+    - If the information already exists, it is skipped.
     - If it is skipped, you should use read_saved_user_Spotify_information_tool '''
 
-    filename = SETTINGS.username + ".json"
-    if not (os.path.exists(filename)):
+    ensure_user_imported(SETTINGS.username)
+    if not has_snapshots(SETTINGS.username):
     
         sp = spotify_object.get_spotify_object()
-        time_ranges = ['short_term', 'medium_term', 'long_term']
-        song_ids = []
-        songs = []
-        artists = []
-        user_top_tracks = []
-        artists_ids_set = set()
-
-        for time_range in time_ranges:
-            results = sp.current_user_top_tracks(limit=50, offset=0, time_range=time_range)
-            for song in results['items']:
-                if song['id'] in song_ids:
-                    continue
-                song_ids.append(song['id']) 
-                songs.append(song['name'])
-                artists.append(song['artists'][0]['name'])
-                artists_ids_set.add(song['artists'][0]['id'])
-                
-                user_top_tracks.append(Song(id=song['id'], name=song['name'], artist=song['artists'][0]['name']))
-
-        if len(artists_ids_set) > 50:
-            artists_ids_set = list(artists_ids_set)[:50]
-
-        user_top_artists = get_several_artists_Spotify(list(artists_ids_set))
-
-        user_top_genres = [genre for artist in user_top_artists for genre in artist.genres]
-        user_top_genres = set(user_top_genres)
-
-        user_top_tracks_list = [Song(id=song.id, name=song.name, artist=song.artist) for song in user_top_tracks]
+
+        with ThreadPoolExecutor(max_workers=len(TIME_RANGES)) as executor:
+            results_by_time_range = dict(zip(TIME_RANGES, executor.map(lambda time_range: _get_top_tracks(sp, time_range), TIME_RANGES)))
+
+        # dicts en vez de listas: busqueda O(1) y conservan el orden de aparicion
+        user_top_tracks = {}
+        artists_ids = {}
+        time_ranges = {}
+        for time_range, results in results_by_time_range.items():
+            time_range_track_ids = []
+            time_range_artist_ids = {}
+            for song in results:
+                artist = song['artists'][0]
+                time_range_track_ids.append(song['id'])
+                time_range_artist_ids.setdefault(artist['id'])
+                artists_ids.setdefault(artist['id'])
+                if song['id'] not in user_top_tracks:
+                    user_top_tracks[song['id']] = Song(id=song['id'], name=song['name'], artist=artist['name'])
+            time_ranges[time_range] = UserInformationTimeRange(
+                top_track_ids=time_range_track_ids,
+                top_artist_ids=list(time_range_artist_ids),
+            )
+
+        artists_ids = list(artists_ids)
+        artists_batches = [artists_ids[start:start + 50] for start in range(0, len(artists_ids), 50)]
+        with ThreadPoolExecutor(max_workers=SETTINGS.paging_max_workers) as executor:
+            user_top_artists = [artist for batch in executor.map(get_several_artists_Spotify, artists_batches) for artist in batch]
+
+        # Generos ordenados por cuantos artistas los comparten
+        user_top_genres = Counter(genre for artist in user_top_artists for genre in artist.genres or [])
+
+        user_top_tracks_list = list(user_top_tracks.values())
 
         user_top_tracks = UserInformationTopTracks(
         num=len(user_top_tracks_list),  
@@ -273,7 +300,7 @@ def get_user_information_from_Spotify():
             top_artists=user_top_artists
         )
 
-        user_top_genres_list = list(user_top_genres)
+        user_top_genres_list = [genre for genre, _ in user_top_genres.most_common()]
 
         user_top_genres = UserInformationTopGenres(
             num=len(user_top_genres_list),
@@ -285,7 +312,8 @@ def get_user_information_from_Spotify():
             date=date.today(),
             top_tracks=user_top_tracks,
             top_artists=user_top_artists,
-            top_genres=user_top_genres
+            top_genres=user_top_genres,
+            time_ranges=time_ranges
         )
 
         save_user_information(user_information)
@@ -293,64 +321,64 @@ def get_user_information_from_Spotify():
         return user_information
 
 
-get_user_information_tool = FunctionTool.from_defaults(fn=get_user_information_from_Spotify, return_direct=False)
+get_user_information_tool = CompactFunctionTool.from_defaults(fn=get_user_information_from_Spotify, return_direct=False)
 
-def read_saved_user_Spotify_information() -> str:
+def read_saved_user_Spotify_information(full: bool = False) -> str:
     """
-    Reads user information from Spotify from a JSON file and generates a string for the AI agent to easily read it.
+    Reads user information from Spotify from the user information database and generates a string for the AI agent to easily read it.
     This user information contains the user's top tracks, top artists, and top genres.
     You can safely assume these are the user's favorite songs, artists, and genres.
 
     ### Usage
-    - Input: None
+    - Input: This function accepts one optional input:
+        1. **full** (bool): If False (default), returns a compact digest that merges all the saved data and keeps the most relevant tracks, artists and genres. If True, returns every track, artist and genre of the most recent saved snapshots.
     
     ###Output:
-    - str: A formatted string including all the user's Spotify data that was saved.
+    - str: A formatted string with the user's saved Spotify data.
     
     ### Notes
-    - Assumes the JSON file matches the structure of the UserInformation model.
+    - The digest is enough for recommendations and playlists, only use **full** when the user asks for the complete saved data.
     """
-    file_path = SETTINGS.username+ SETTINGS.log_file
-    file = Path(file_path)
-    if not file.is_file():
-        return "Error: User data file not found."
+    ensure_user_imported(SETTINGS.username)
+    if not full:
+        digest = get_profile_digest(SETTINGS.username)
+        return digest if digest is not None else "Error: No saved user data found."
 
-    with open(file_path, "r") as file:
-        user_data_list = json.load(file)
+    user_data_list = read_snapshots(SETTINGS.username, limit=SETTINGS.saved_snapshots_limit)
+    if not user_data_list:
+        return "Error: No saved user data found."
 
-    summary = "User Spotify Information:\n\n"
+    lines = ["User Spotify Information:", ""]
 
     for user_data in user_data_list:
 
         # General Information
-        summary += f"[Username: {user_data.get('username', 'N/A')}\n"
-        summary += f"Date of Data Collection: {user_data.get('date', 'N/A')}\n\n"
-        
+        lines.append(f"[Username: {user_data.username}")
+        lines.append(f"Date of Data Collection: {user_data.date.isoformat()}")
+        lines.append("")
+
         # Top Tracks
-        top_tracks = user_data.get('top_tracks', {})
-        summary += f"Top {top_tracks.get('num', 0)} Tracks:\n"
-        for track in top_tracks.get('top_tracks', []):
-            summary += f"  - ID: {track.get('id')}, Name: {track.get('name')} by {track.get('artist')}\n"
-        summary += "\n"
+        lines.append(f"Top {user_data.top_tracks.num} Tracks:")
+        lines.extend(f"  - ID: {track.id}, Name: {track.name} by {track.artist}" for track in user_data.top_tracks.top_tracks)
+        lines.append("")
 
         # Top Artists
-        top_artists = user_data.get('top_artists', {})
-        summary += f"Top {top_artists.get('num', 0)} Artists:\n"
-        for artist in top_artists.get('top_artists', []):
-            summary += f"  - ID: {artist.get('id')}, Name: {artist.get('name')} (Genres: {', '.join(artist.get('genres', [])) if artist.get('genres') else 'N/A'})\n"
-        summary += "\n"
+        lines.append(f"Top {user_data.top_artists.num} Artists:")
+        lines.extend(
+            f"  - ID: {artist.id}, Name: {artist.name} (Genres: {', '.join(artist.genres) if artist.genres else 'N/A'})"
+            for artist in user_data.top_artists.top_artists
+        )
+        lines.append("")
 
         # Top Genres
-        top_genres = user_data.get('top_genres', {})
-        summary += f"Top {top_genres.get('num', 0)} Genres:\n"
-        for genre in top_genres.get('top_genres', []):
-            summary += f"  - {genre}\n"
+        lines.append(f"Top {user_data.top_genres.num} Genres:")
+        lines.extend(f"  - {genre}" for genre in user_data.top_genres.top_genres)
 
-        summary += "]\n"
+        lines.append("]")
 
-    return summary
+    return "\n".join(lines) + "\n"
 
-read_saved_user_Spotify_information_tool = FunctionTool.from_defaults(fn=read_saved_user_Spotify_information, return_direct=False)
+read_saved_user_Spotify_information_tool = CompactFunctionTool.from_defaults(fn=read_saved_user_Spotify_information, return_direct=False)
 
 
 def get_recommendations_Spotify(seed_artists: list[str] | None = None, seed_genres: list[str] | None = None, seed_tracks: list[str] | None = None) -> list[str]:
@@ -374,6 +402,7 @@ def get_recommendations_Spotify(seed_artists: list[str] | None = None, seed_genr
     - This function retrieves recommended tracks based on the provided seed(s). You must use another tool to create the playlist with the tracks.
     - Ensure the Spotify authorization object is properly initialized for user-specific actions.
     - You should select 5 artists, 5 songs, and/or 5 genres according to their saved Spotify data.
+    - If the Spotify recommendations service fails, the tracks come from the local recommender (see `get_local_recommendations_Spotify`), steered by the seed artists, tracks and genres it knows.
     """
 
     if not any([seed_artists, seed_genres, seed_tracks]):
@@ -381,12 +410,102 @@ def get_recommendations_Spotify(seed_artists: list[str] | None = None, seed_genr
 
     sp = spotify_object.get_spotify_object()
 
-    recommendations = sp.recommendations(seed_artists=seed_artists, seed_genres=seed_genres, seed_tracks=seed_tracks, limit=50)
+    try:
+        recommendations = sp.recommendations(seed_artists=seed_artists, seed_genres=seed_genres, seed_tracks=seed_tracks, limit=50)
+    except spotipy.SpotifyException as e:
+        # El endpoint de recomendaciones no siempre esta disponible, se recomienda con el indice local
+        print(f"Spotify recommendations failed, using the local recommender: {e}")
+        ensure_user_imported(SETTINGS.username)
+        recommender = get_recommender()
+        return recommender.recommend(
+            SETTINGS.username,
+            limit=50,
+            seed_artists=recommender.seed_artist_names(seed_artists, seed_tracks),
+            seed_genres=seed_genres,
+        )
     track_uris = [track['uri'] for track in recommendations['tracks']]
 
     return track_uris
 
-get_recommendations_Spotify_tool = FunctionTool.from_defaults(fn=get_recommendations_Spotify, return_direct=False)
+get_recommendations_Spotify_tool = CompactFunctionTool.from_defaults(fn=get_recommendations_Spotify, return_direct=False)
+
+def get_local_recommendations_Spotify(limit: int = 30, seed_artists: list[str] | None = None, seed_genres: list[str] | None = None) -> list[str]:
+    """
+    This function recommends tracks for the user from their saved Spotify information, without calling the Spotify recommendations API. It is much faster than `get_recommendations_Spotify`.
+    IT DOES NOT CREATE A PLAYLIST. IT JUST RETURNS A LIST OF TRACKS.
+    The output is a list of uri strings that identify each recommended track and should be passed to the `create_Spotify_playlist` function.
+
+    ### Usage
+    - Input: This function accepts three optional parameters:
+        1. **limit** (int): The number of tracks to recommend. Default is 30.
+        2. **seed_artists** (list[str] | None): Artist NAMES (not IDs) to steer the recommendations towards. *Send them as a list of strings.*
+        3. **seed_genres** (list[str] | None): Genre names to steer the recommendations towards. *Send them as a list of strings.*
+
+    ### Output
+    - The function returns an array of uri strings that identify each recommended track, best matches first. Tracks already in the user's top tracks are not included.
+
+    ### Notes
+    - Recommendations are based on the artists and genres the user listens to the most, and only include tracks the assistant already knows (from saved user information and previous Spotify searches).
+    - If it returns an empty list, use `get_recommendations_Spotify` or `search_Spotify` instead.
+    """
+    ensure_user_imported(SETTINGS.username)
+    return get_recommender().recommend(SETTINGS.username, limit=limit, seed_artists=seed_artists, seed_genres=seed_genres)
+
+get_local_recommendations_Spotify_tool = CompactFunctionTool.from_defaults(fn=get_local_recommendations_Spotify, return_direct=False)
+
+def get_similar_users_Spotify(top_k: int = SETTINGS.taste_neighbours, limit: int = 20) -> str:
+    """
+    This function finds the users of the assistant whose music taste is closest to the user's, and the artists that are popular among them but not among the user's top artists.
+
+    ### Usage
+    - Input: This function accepts two optional parameters:
+        1. **top_k** (int): The number of similar users to return. Default is 5.
+        2. **limit** (int): The number of artists to return. Default is 20.
+
+    ### Output
+    - str: Two compact tables, the similar users with their similarity (0 to 1) and the suggested artists with their score.
+
+    ### Notes
+    - Taste is compared using the most recent saved Spotify information (top artists and genres) of every user.
+    - Use the suggested artists with `search_Spotify` to discover new music for the user.
+    """
+    ensure_user_imported(SETTINGS.username)
+    taste_index = get_taste_index()
+    neighbours = taste_index.similar_users(SETTINGS.username, top_k)
+    if not neighbours:
+        return "No similar users found."
+
+    lines = ["Similar users (Username | Similarity)"]
+    lines.extend(f"{username} | {similarity:.2f}" for username, similarity in neighbours)
+    artists = taste_index.neighbour_artists(SETTINGS.username, top_k, limit)
+    if artists:
+        lines.append("Artists popular among them (Name | Score)")
+        lines.extend(f"{name} | {score:.2f}" for name, score in artists)
+    return "\n".join(lines)
+
+get_similar_users_Spotify_tool = CompactFunctionTool.from_defaults(fn=get_similar_users_Spotify, return_direct=False)
+
+def get_taste_drift_Spotify(top_k: int = SETTINGS.drift_top_k) -> str:
+    """
+    This function describes how the user's music taste has changed over time, using all the Spotify information saved for the user.
+
+    ### Usage
+    - Input: This function accepts one optional parameter:
+        1. **top_k** (int): The maximum number of items listed in each section. Default is 10.
+
+    ### Output
+    - str: A compact report with these sections:
+        - The artists and tracks that moved the most in the ranking since the previous saved snapshot and since the first one (Name | Rank | Change, a positive change means it went up).
+        - The artists and tracks that appeared for the first time or were dropped in the latest snapshot.
+        - The share of the user's top genres month by month.
+
+    ### Notes
+    - Use this tool when the user asks how their taste has changed, what they listen to more or less than before, or what they discovered recently.
+    """
+    ensure_user_imported(SETTINGS.username)
+    return format_drift(drift_tracker.get_state(SETTINGS.username), top_k)
+
+get_taste_drift_Spotify_tool = CompactFunctionTool.from_defaults(fn=get_taste_drift_Spotify, return_direct=False)
 
 def search_Spotify( type: str,artist: str | None = None, album: str | None = None, track: str | None = None, genre: str | None = None, limit: int = 10) -> list[str]:
     """
@@ -435,7 +554,7 @@ def search_Spotify( type: str,artist: str | None = None, album: str | None = Non
     return list_uris
 
 
-search_Spotify_tool = FunctionTool.from_defaults(fn=search_Spotify, return_direct=False)
+search_Spotify_tool = CompactFunctionTool.from_defaults(fn=search_Spotify, return_direct=False)
 
 def get_album_Spotify(album_uri: str) -> Album:
     """
@@ -464,4 +583,33 @@ def get_album_Spotify(album_uri: str) -> Album:
     )
     return album
 
-get_album_Spotify_tool = FunctionTool.from_defaults(fn=get_album_Spotify, return_direct=False)
\ No newline at end of file
+get_album_Spotify_tool = CompactFunctionTool.from_defaults(fn=get_album_Spotify, return_direct=False)
+
+
+tool_registry = ToolRegistry()
+for tool in [
+    music_query_tool,
+    wikipedia_tool,
+    lyrics_genius_tool,
+    create_Spotify_playlist_tool,
+    show_all_Spotify_playlists_tool,
+    show_specific_Spotify_playlist_tracks_tool,
+    get_artist_Spotify_tool,
+    get_several_artists_Spotify_tool,
+    get_user_information_tool,
+    read_saved_user_Spotify_information_tool,
+    get_recommendations_Spotify_tool,
+    get_local_recommendations_Spotify_tool,
+    get_similar_users_Spotify_tool,
+    get_taste_drift_Spotify_tool,
+    search_Spotify_tool,
+    get_album_Spotify_tool,
+]:
+    tool_registry.register(tool)
+
+# Recursos pesados, se crean en el primer uso o en segundo plano con tool_registry.warm_up()
+tool_registry.register_warmup("llm", get_llm)
+tool_registry.register_warmup("music_index", get_music_query_engine)
+tool_registry.register_warmup("genius", get_genius)
+tool_registry.register_warmup("spotify", spotify_object.get_spotify_object)
+tool_registry.register_warmup("wikipedia", get_wikipedia_client)
@@ -0,0 +1,100 @@
+import re
+import math
+import wikipediaapi
+from requests.adapters import HTTPAdapter
+from music_assistant.cache import TTLCache, locked_cache
+from music_assistant.config import get_agent_settings
+from music_assistant.utils import estimate_tokens
+
+SETTINGS = get_agent_settings()
+USER_AGENT = 'MusicChatbot/1.0 (https://www.upb.edu/)'
+
+wikipedia_cache = TTLCache("wikipedia", SETTINGS.cache_path, max_entries=256)
+
+
+@locked_cache
+def get_wikipedia_client(language: str = SETTINGS.wikipedia_language) -> wikipediaapi.Wikipedia:
+    """
+    One client per language and process, reusing a pooled HTTP session for every page request.
+    """
+    client = wikipediaapi.Wikipedia(USER_AGENT, language)
+    adapter = HTTPAdapter(pool_connections=SETTINGS.wikipedia_pool_size, pool_maxsize=SETTINGS.wikipedia_pool_size)
+    client._session.mount("https://", adapter)
+    return client
+
+
+def _flatten_sections(sections, parent: str = "") -> list[dict]:
+    flattened = []
+    for section in sections:
+        title = f"{parent} > {section.title}" if parent else section.title
+        if section.text.strip():
+            flattened.append({"title": title, "text": section.text.strip()})
+        flattened.extend(_flatten_sections(section.sections, title))
+    return flattened
+
+
+def fetch_wikipedia_sections(title: str, language: str = SETTINGS.wikipedia_language) -> list[dict] | None:
+    """
+    Returns the page split into `{"title", "text"}` sections, the summary first.
+    Pages are cached by (language, title) for `wikipedia_refresh_ttl` seconds; missing pages return None.
+    """
+    key = f"{language}:{title.strip().lower()}"
+    cached = wikipedia_cache.get(key)
+    if cached is not None:
+        return cached["sections"]
+
+    page = get_wikipedia_client(language).page(title)
+    sections = None
+    if page.exists():
+        sections = [{"title": "Summary", "text": page.summary.strip()}] + _flatten_sections(page.sections)
+
+    wikipedia_cache.set(key, {"sections": sections}, SETTINGS.wikipedia_refresh_ttl)
+    return sections
+
+
+def _terms(text: str) -> list[str]:
+    return [term for term in re.findall(r"\w+", text.lower()) if len(term) > 2]
+
+
+def select_relevant_sections(sections: list[dict], query: str, token_budget: int = SETTINGS.wikipedia_token_budget) -> str:
+    """
+    Keeps the summary plus the sections that best match `query` (term frequency weighted by rarity
+    across the page), stopping at `token_budget`. Sections are returned in page order.
+    """
+    query_terms = set(_terms(query))
+    section_terms = [_terms(section["title"] + " " + section["text"]) for section in sections]
+    document_frequency = {
+        term: sum(1 for terms in section_terms if term in terms) for term in query_terms
+    }
+
+    scores = []
+    for index, terms in enumerate(section_terms):
+        score = 0.0
+        for term in query_terms:
+            count = terms.count(term)
+            if count:
+                score += (1 + math.log(count)) * math.log(1 + len(sections) / document_frequency[term])
+        if query_terms & set(_terms(sections[index]["title"])):
+            score *= 2
+        scores.append(score)
+
+    # El resumen siempre va primero, despues las secciones mas relevantes
+    ranking = [0] + sorted(
+        (index for index in range(1, len(sections)) if scores[index] > 0),
+        key=lambda index: scores[index],
+        reverse=True,
+    )
+
+    selected = {}
+    remaining = token_budget
+    for index in ranking:
+        text = sections[index]["text"]
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            if not selected:
+                selected[index] = text[: remaining * 4] + "..."
+            continue
+        selected[index] = text
+        remaining -= tokens
+
+    return "\n\n".join(f"== {sections[index]['title']} ==\n{selected[index]}" for index in sorted(selected))
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any
+import pytest
+from llama_index.core.agent import ReActAgent
+from llama_index.core.base.llms.types import ChatMessage, ChatResponse, CompletionResponse, LLMMetadata, MessageRole
+from llama_index.core.llms import CustomLLM
+from music_assistant.agent import ChatMetrics, astream_agent_response, strip_answer_marker
+
+
+class ChunkedLLM(CustomLLM):
+    # Responde siempre con los mismos chunks, como un LLM que corta "Answer:" entre tokens
+    chunks: list[str]
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(is_chat_model=True)
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text="".join(self.chunks))
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        raise NotImplementedError
+
+    async def astream_chat(self, messages: list[ChatMessage], **kwargs: Any):
+        async def gen():
+            content = ""
+            for chunk in self.chunks:
+                content += chunk
+                yield ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=content), delta=chunk)
+
+        return gen()
+
+
+async def collect(agent: ReActAgent, message: str) -> list[str]:
+    return [text async for text in astream_agent_response(agent, message, metrics=ChatMetrics())]
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        ["Thought: I can answer without tools.\nAnswer: ", "Hola", " mundo"],
+        ["Thought: I can answer without tools.\nAnswer", ": Hola", " mundo"],
+        ["Thought: I can answer without tools.\nAnsw", "er: Hola", " mundo"],
+        ["Thought: I can answer without tools.\nAnsw", "er", ":", " Hola mundo"],
+    ],
+)
+def test_stream_strips_split_answer_marker(chunks):
+    agent = ReActAgent.from_tools([], llm=ChunkedLLM(chunks=chunks))
+    outputs = asyncio.run(collect(agent, "saluda"))
+    assert outputs[-1] == "Hola mundo"
+    assert all("Hola mundo".startswith(output) for output in outputs)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [("r", None), ("er: Hola", "Hola"), ("  : Hola", "Hola"), ("Thought: ok\\nAnswer: Hola", "Hola"), ("rock", "rock")],
+)
+def test_strip_answer_marker(text, expected):
+    assert strip_answer_marker(text.replace("\\n", "\n")) == expected
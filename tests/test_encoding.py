@@ -0,0 +1,25 @@
+from music_assistant.encoding import encode_tool_output
+from music_assistant.models import Song
+
+
+SONGS = [Song(id=f"track{position:02d}", name=f"Una cancion con un nombre largo {position}", artist=f"Artista {position}") for position in range(50)]
+
+
+def test_truncated_songs_keep_every_id():
+    text = encode_tool_output(SONGS, token_budget=120)
+    assert "more items, IDs only:" in text
+    assert all(song.id in text for song in SONGS)
+    # Las filas recortadas pierden el nombre y el artista
+    assert SONGS[-1].name not in text
+
+
+def test_truncated_uris_keep_every_uri():
+    uris = [f"spotify:track:{song.id}" for song in SONGS]
+    text = encode_tool_output(uris, token_budget=50)
+    assert all(uri in text for uri in uris)
+
+
+def test_songs_within_budget_are_not_cut():
+    text = encode_tool_output(SONGS[:3], token_budget=1000)
+    assert "more items" not in text
+    assert text.splitlines() == ["ID | Name | Artist"] + [f"{song.id} | {song.name} | {song.artist}" for song in SONGS[:3]]
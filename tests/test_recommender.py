@@ -0,0 +1,37 @@
+import random
+import numpy as np
+from music_assistant.recommender import RecommenderIndex
+
+
+def add(index: RecommenderIndex, operation: tuple):
+    if operation[0] == "artist":
+        index.add_artist(operation[1], operation[2])
+    else:
+        index.add_track(operation[1], operation[2])
+
+
+def test_incremental_matrix_matches_full_build():
+    rng = random.Random(0)
+    operations = [
+        ("artist", f"artist {rng.randrange(40)}", [f"genre {rng.randrange(15)}" for _ in range(rng.randrange(3))])
+        if rng.random() < 0.3 else ("track", f"track {position}", f"artist {rng.randrange(40)}")
+        for position in range(400)
+    ]
+
+    incremental = RecommenderIndex()
+    for position, operation in enumerate(operations):
+        add(incremental, operation)
+        # Actualizaciones intermedias: columnas nuevas, filas nuevas y artistas que ganan generos
+        if position % 37 == 0:
+            incremental._update()
+    incremental._update()
+
+    full = RecommenderIndex()
+    for operation in operations:
+        add(full, operation)
+    full._update()
+
+    assert incremental._matrix.shape == full._matrix.shape
+    assert abs(incremental._matrix - full._matrix).max() < 1e-6
+    norms = np.sqrt(np.asarray(incremental._matrix.multiply(incremental._matrix).sum(axis=1)).ravel())
+    assert np.allclose(norms, 1.0, atol=1e-5)
@@ -0,0 +1,93 @@
+import zlib
+import numpy as np
+import pytest
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from music_assistant import router
+from music_assistant.models import Playlist, PlaylistWithTracks, Song
+from music_assistant.router import IntentRouter, normalize_text
+
+
+class BagOfWordsEmbedding(BaseEmbedding):
+    # Embeddings deterministicos para no descargar el modelo: una dimension por palabra
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(512, dtype=np.float32)
+        for word in normalize_text(text).split():
+            vector[zlib.crc32(word.encode()) % len(vector)] += 1.0
+        return vector.tolist()
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._embed(text)
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return self._embed(query)
+
+
+PLAYLISTS = [
+    Playlist(id="1", name="Verano", num_tracks=1),
+    Playlist(id="2", name="Gym", num_tracks=1),
+]
+
+
+@pytest.fixture
+def intent_router(monkeypatch):
+    monkeypatch.setattr(router, "show_all_Spotify_playlists", lambda: PLAYLISTS)
+    monkeypatch.setattr(
+        router,
+        "show_specific_Spotify_playlist_tracks",
+        lambda playlist_id: PlaylistWithTracks(id=playlist_id, total=1, tracks=[Song(id="t1", name="Despechá", artist="Rosalía")]),
+    )
+    embed_model = BagOfWordsEmbedding()
+    # Umbral bajo a proposito: las peticiones de acciones lo superan, como pasa con e5, y solo el margen las separa
+    return IntentRouter(lambda: embed_model, threshold=0.3, margin=0.03)
+
+
+HANDLED_INTENTS = ("show_all_playlists", "show_playlist_tracks")
+
+
+# Parafrasis, ninguna es una frase de ejemplo de INTENT_EXEMPLARS
+@pytest.mark.parametrize("message, intent", [
+    ("enséñame las playlists que tengo", "show_all_playlists"),
+    ("cuáles playlists tengo en Spotify", "show_all_playlists"),
+    ("qué temas tiene la playlist Verano", "show_playlist_tracks"),
+    ("show me what songs are in my playlist Gym", "show_playlist_tracks"),
+])
+def test_routes_show_requests(intent_router, message, intent):
+    assert intent_router.classify(message)[0] == intent
+    assert intent_router.route(message) is not None
+
+
+@pytest.mark.parametrize("message", [
+    "añádele temas de Shakira a mi playlist Verano",
+    "quiero borrar la playlist Gym",
+    "elimina unas canciones de mi playlist Gym",
+    "hazme una playlist nueva llamada Verano",
+    "recomiéndame música parecida a mi playlist Gym",
+])
+def test_actions_on_playlists_fall_through(intent_router, message):
+    assert intent_router.classify(message)[0] not in HANDLED_INTENTS
+    assert intent_router.route(message) is None
+
+
+# Mencionan playlists pero no piden verlas
+@pytest.mark.parametrize("message", [
+    "what playlist should I make?",
+    "qué playlist debería crear?",
+    "qué playlist me hago para el gym?",
+    "cuál es la mejor playlist de Spotify?",
+])
+def test_near_misses_fall_through(intent_router, message):
+    assert intent_router.classify(message)[0] not in HANDLED_INTENTS
+    assert intent_router.route(message) is None
+
+
+def test_close_intents_fall_through_by_margin(intent_router):
+    # Queda a menos de 0.03 entre ver todas las playlists y ver las canciones de una
+    message = "qué canciones hay en mis playlists"
+    intent_router.margin = 0.0
+    assert intent_router.classify(message)[0] == "show_playlist_tracks"
+    intent_router.margin = 0.03
+    assert intent_router.classify(message)[0] is None
+    assert intent_router.route(message) is None
@@ -0,0 +1,37 @@
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.response.schema import Response
+from llama_index.core.embeddings import MockEmbedding
+from music_assistant.semantic_cache import SemanticCache, SemanticCacheQueryEngine
+
+
+class VersionedQueryEngine(BaseQueryEngine):
+    # Responde con la version del indice sobre el que se construyo
+    def __init__(self, version: str):
+        self.version = version
+        super().__init__(callback_manager=None)
+
+    def _get_prompt_modules(self) -> dict:
+        return {}
+
+    def _query(self, query_bundle) -> Response:
+        return Response(response=f"answer from {self.version}")
+
+    async def _aquery(self, query_bundle) -> Response:
+        return self._query(query_bundle)
+
+
+def test_new_index_version_reloads_the_wrapped_engine():
+    store = {"version": "v1"}
+    engine = SemanticCacheQueryEngine(
+        VersionedQueryEngine("v1"),
+        embed_model=MockEmbedding(embed_dim=8),
+        cache=SemanticCache(threshold=0.9),
+        index_version=lambda: store["version"],
+        reload_query_engine=lambda: VersionedQueryEngine(store["version"]),
+    )
+    assert str(engine.query("canciones de verano")) == "answer from v1"
+    assert engine.query("canciones de verano").metadata["semantic_cache"]
+
+    store["version"] = "v2"
+    assert str(engine.query("canciones de verano")) == "answer from v2"
+    assert engine.cache_stats()["invalidations"] == 1